@@ -2,10 +2,61 @@
 API Utility Module for handling retries and timeouts with data validation
 """
 
+import json
 import requests
 import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Optional, Dict, Any, Callable
 
+# Prefer orjson for faster payload encoding / response decoding when available
+try:
+    import orjson
+    _json_loads = orjson.loads
+
+    def _json_dumps(obj):
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            # orjson rejects non-str dict keys and ints wider than 64 bits
+            return json.dumps(obj).encode('utf-8')
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(obj):
+        return json.dumps(obj).encode('utf-8')
+
+def create_session(pool_connections: int = 10, pool_maxsize: int = 20, retries: int = 0,
+                   backoff_factor: float = 0.3, status_forcelist: tuple = (502, 503, 504)) -> requests.Session:
+    """
+    Create a requests Session with a pooled HTTPS adapter so calls to the same
+    host reuse keep-alive connections instead of a new TCP+TLS handshake each time
+
+    Args:
+        pool_connections: Number of host pools to cache
+        pool_maxsize: Maximum connections kept per host pool
+        retries: Transport-level retries for connection errors and status_forcelist (0 disables)
+        backoff_factor: Backoff factor between transport retries
+        status_forcelist: HTTP status codes that trigger a transport retry
+
+    Returns:
+        Configured requests.Session
+    """
+    max_retries = 0
+    if retries:
+        # The marketsmojo POST endpoints are read-only lookups, so retrying POST is safe
+        max_retries = Retry(total=retries, backoff_factor=backoff_factor,
+                            status_forcelist=status_forcelist,
+                            allowed_methods=frozenset({'GET', 'POST'}),
+                            raise_on_status=False)
+
+    # requests already sends "Accept-Encoding: gzip, deflate" by default
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_connections=pool_connections,
+                                          pool_maxsize=pool_maxsize,
+                                          max_retries=max_retries))
+    return session
+
 def validate_api_response(result: Dict, required_fields: Optional[list] = None, check_main_header: bool = True) -> bool:
     """
     Validate that API response contains actual data, not just success status
@@ -51,6 +102,10 @@ def validate_api_response(result: Dict, required_fields: Optional[list] = None,
 
     return True
 
+# Shared session so repeated calls to the same API host reuse keep-alive connections.
+# Retries are handled by APIRetryHandler, so the adapter itself does not retry.
+_SESSION = create_session(pool_connections=10, pool_maxsize=20)
+
 class APIRetryHandler:
     """
     Handles API requests with automatic retry logic and exponential backoff
@@ -90,19 +145,30 @@ class APIRetryHandler:
         Returns:
             Response JSON or None if all retries failed
         """
+        # Encode JSON payload once up front so orjson is used when available
+        request_headers = headers
+        body = None
+        if json_data is not None:
+            request_headers = {'Content-Type': 'application/json', **(headers or {})}
+            try:
+                body = _json_dumps(json_data)
+            except (TypeError, ValueError) as e:
+                print(f"[ERROR] {description} payload could not be encoded: {str(e)}")
+                return None
+
         for attempt in range(self.max_retries):
             try:
                 # Make the request
                 if method.upper() == 'GET':
-                    response = requests.get(url, headers=headers, params=params, timeout=self.timeout)
+                    response = _SESSION.get(url, headers=headers, params=params, timeout=self.timeout)
                 elif method.upper() == 'POST':
-                    response = requests.post(url, headers=headers, params=params, json=json_data, timeout=self.timeout)
+                    response = _SESSION.post(url, headers=request_headers, params=params, data=body, timeout=self.timeout)
                 else:
-                    response = requests.request(method, url, headers=headers, params=params, json=json_data, timeout=self.timeout)
+                    response = _SESSION.request(method, url, headers=request_headers, params=params, data=body, timeout=self.timeout)
 
                 # Check if successful
                 if response.status_code == 200:
-                    result = response.json()
+                    result = _json_loads(response.content)
 
                     # Validate the response data
                     if validate_func:
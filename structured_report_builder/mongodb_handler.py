@@ -1,9 +1,10 @@
 """
 MongoDB Handler for fetching historical data from mojo_dots_hist collection
 """
+import itertools
 import pymongo
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import logging
 
 class MongoDBHandler:
@@ -55,47 +56,93 @@ class MongoDBHandler:
             # Get records sorted by date descending
             cursor = self.collection.find(query).sort('date', -1)
 
-            # Process to find grade changes
-            grade_changes = []
-            prev_grade = None
-            prev_date = None
+            return self._valuation_grade_changes(cursor, limit)
 
-            for doc in cursor:
-                current_grade = doc.get('valuation_grade', '').lower()
-                current_date = doc.get('date', '')
+        except Exception as e:
+            self.logger.error(f"Error fetching valuation history: {e}")
+            return []
 
-                # Skip if no grade
-                if not current_grade:
-                    continue
+    def _valuation_grade_changes(self, docs, limit: int) -> List[Dict]:
+        """
+        Collect valuation grade changes from documents sorted by date descending
 
-                # On first iteration, just save as previous
-                if prev_grade is None:
-                    prev_grade = current_grade
-                    prev_date = current_date
-                    continue
+        Args:
+            docs: Iterable of mojo_dots_hist documents, newest first
+            limit: Number of grade changes to return
 
-                # If grade changed, record the change
-                if current_grade != prev_grade and prev_date:
-                    grade_changes.append({
-                        'from_grade': current_grade,  # older grade
-                        'to_grade': prev_grade,       # newer grade
-                        'date': prev_date,             # date of change
-                        'formatted_date': self._format_date(prev_date)
-                    })
+        Returns:
+            List of valuation grade changes with dates
+        """
+        # Process to find grade changes
+        grade_changes = []
+        prev_grade = None
+        prev_date = None
 
-                    # Stop if we have enough changes
-                    if len(grade_changes) >= limit:
-                        break
+        for doc in docs:
+            current_grade = doc.get('valuation_grade', '').lower()
+            current_date = doc.get('date', '')
 
-                # Update previous values
+            # Skip if no grade
+            if not current_grade:
+                continue
+
+            # On first iteration, just save as previous
+            if prev_grade is None:
                 prev_grade = current_grade
                 prev_date = current_date
+                continue
+
+            # If grade changed, record the change
+            if current_grade != prev_grade and prev_date:
+                grade_changes.append({
+                    'from_grade': current_grade,  # older grade
+                    'to_grade': prev_grade,       # newer grade
+                    'date': prev_date,             # date of change
+                    'formatted_date': self._format_date(prev_date)
+                })
 
-            return grade_changes
+                # Stop if we have enough changes
+                if len(grade_changes) >= limit:
+                    break
+
+            # Update previous values
+            prev_grade = current_grade
+            prev_date = current_date
+
+        return grade_changes
+
+    def get_valuation_snapshot(self, stock_id: int, limit: int = 5) -> Tuple[Optional[str], List[Dict]]:
+        """
+        Get current valuation grade and grade history with a single query
+        Equivalent to get_current_valuation_grade + get_valuation_grade_history,
+        but reads one cursor instead of making two round-trips
+
+        Args:
+            stock_id: Stock ID to fetch data for
+            limit: Number of grade changes to return (default 5)
+
+        Returns:
+            Tuple of (current valuation grade or None, list of valuation grade changes)
+        """
+        try:
+            query = {'stockid': stock_id}
+            projection = {'_id': 0, 'date': 1, 'valuation_grade': 1}
+
+            # Get records sorted by date descending; the first one is the current grade
+            docs = iter(self.collection.find(query, projection).sort('date', -1))
+            latest_doc = next(docs, None)
+            if latest_doc is None:
+                return None, []
+
+            grade = latest_doc.get('valuation_grade', '')
+            current_grade = self._format_valuation_grade(grade) if grade else None
+
+            history = self._valuation_grade_changes(itertools.chain([latest_doc], docs), limit)
+            return current_grade, history
 
         except Exception as e:
-            self.logger.error(f"Error fetching valuation history: {e}")
-            return []
+            self.logger.error(f"Error fetching valuation snapshot: {e}")
+            return None, []
 
     def get_current_valuation_grade(self, stock_id: int) -> Optional[str]:
         """
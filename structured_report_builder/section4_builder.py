@@ -69,27 +69,27 @@ class Section4Builder:
         except:
             return [], []
 
-    def _extract_field_value(self, data_items, field_name, period_key, key_type='consolidate'):
-        """Extract field value from data items for a specific period"""
-        try:
-            for section in data_items:
-                # Check direct match
-                if section.get(key_type) == field_name:
-                    value = section.get(period_key)
-                    if value is not None:
-                        return str(value)
-
-                # Check in nested items
-                items = section.get('items', [])
-                for item in items:
-                    if item.get(key_type) == field_name:
-                        value = item.get(period_key)
-                        if value is not None:
-                            return str(value)
-
-            return None
-        except Exception as e:
-            return None
+    def _index_field_items(self, data_items, key_type='consolidate'):
+        """Index root and nested items by field name, preserving API order"""
+        index = {}
+        for section in data_items:
+            name = section.get(key_type)
+            if name:
+                index.setdefault(name, []).append(section)
+
+            for item in section.get('items', []):
+                name = item.get(key_type)
+                if name:
+                    index.setdefault(name, []).append(item)
+        return index
+
+    def _extract_field_value(self, field_index, field_name, period_key):
+        """Extract field value from the field index for a specific period"""
+        for item in field_index.get(field_name, ()):
+            value = item.get(period_key)
+            if value is not None:
+                return str(value)
+        return None
 
     def build_section(self):
         """Build SECTION 4 from API data - branches to bank or non-bank logic"""
@@ -127,14 +127,15 @@ class Section4Builder:
         print(f"[INFO] Found {len(periods)} years: {labels}")
 
         data_items = data_source.get(key_type, [])
+        field_index = self._index_field_items(data_items, key_type)
 
         # Branch based on stock type
         if is_bank:
-            return self._build_bank_section(periods, labels, data_items, key_type)
+            return self._build_bank_section(periods, labels, field_index)
         else:
-            return self._build_non_bank_section(periods, labels, data_items, key_type)
+            return self._build_non_bank_section(periods, labels, field_index)
 
-    def _build_non_bank_section(self, periods, labels, data_items, key_type):
+    def _build_non_bank_section(self, periods, labels, field_index):
         """Build Section 4 for non-bank stocks with standard balance sheet fields"""
         # Field definitions: (display_name, api_field_name)
         field_defs = [
@@ -155,7 +156,7 @@ class Section4Builder:
         for display_name, api_field in field_defs:
             field_values[display_name] = []
             for period_key in periods:
-                value = self._extract_field_value(data_items, api_field, period_key, key_type)
+                value = self._extract_field_value(field_index, api_field, period_key)
                 # Handle "0.00" as "0" for display
                 if value and value != "N/A":
                     try:
@@ -251,7 +252,7 @@ class Section4Builder:
 
         return "\n".join(lines)
 
-    def _build_bank_section(self, periods, labels, data_items, key_type):
+    def _build_bank_section(self, periods, labels, field_index):
         """Build Section 4 for bank stocks with bank-specific fields"""
         # Bank-specific field definitions (includes standard + bank-specific fields)
         bank_field_defs = [
@@ -275,7 +276,7 @@ class Section4Builder:
         for display_name, api_field in bank_field_defs:
             field_values[display_name] = []
             for period_key in periods:
-                value = self._extract_field_value(data_items, api_field, period_key, key_type)
+                value = self._extract_field_value(field_index, api_field, period_key)
                 # Handle "0.00" as "0" for display
                 if value and value != "N/A":
                     try:
@@ -3,10 +3,47 @@ SECTION 6: KEY FINANCIAL RATIOS & METRICS Builder
 Dynamically builds financial ratios using Quality and Valuation data from APIs
 Simplified version - uses pre-calculated ratios from stocksummary/getRecoData APIs
 """
-import requests
+import itertools
 import json
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
 from api_utils import post_with_retry
 
+logger = logging.getLogger(__name__)
+
+# On-disk cache of successful API responses, keyed by stock and day (rolls over daily)
+_CACHE_DIR = Path(".cache") / "section6"
+
+# Ratio categories in priority order: a ratio goes into the first category whose
+# keywords appear in its (lowercased) name. Anything unmatched falls into 'other'.
+_CATEGORY_PATTERNS = tuple(
+    (category, re.compile('|'.join(re.escape(keyword) for keyword in keywords)))
+    for category, keywords in (
+        ('banking', ('npa', 'gnpa', 'nnpa', 'car', 'nim', 'casa', 'advances', 'deposits')),
+        ('profitability', ('roe', 'roa', 'roce', 'margin', 'profit')),
+        ('growth', ('growth', 'cagr')),
+        ('leverage', ('debt', 'interest', 'ebitda', 'coverage')),
+        ('efficiency', ('capital employed', 'turnover', 'asset', 'working capital')),
+    )
+)
+
+# Banking ratios that belong under profitability rather than bank-specific metrics
+_BANKING_PROFIT_PATTERN = re.compile('nim|roe|roa|roce')
+
+# Exact financial sector industry names (Banks, NBFCs, Insurance, Housing Finance)
+_FINANCIAL_SECTORS = frozenset({
+    "Finance",
+    "Housing Finance Company",
+    "Insurance",
+    "Non Banking Financial Company (NBFC)",
+    "Other Bank",
+    "Private Sector Bank",
+    "Public Sector Bank"
+})
+
 class Section6Builder:
     def __init__(self, stock_id, exchange=0):
         self.stock_id = str(stock_id)
@@ -19,86 +56,112 @@ class Section6Builder:
         self.quality_ratios = []
         self.valuation_ratios = []
 
+        # Industry checks, resolved once by fetch_quality_valuation_data
+        self._ind_name = ''
+        self._ind_name_lc = ''
+        self._is_bank = False
+        self._is_fin_sector = False
+        self._fetched = False
+
+    def _resolve_industry(self):
+        """Resolve industry name once after fetching and cache the sector checks"""
+        rec_name = ((self.recommendation_data or {}).get('main_header') or {}).get('ind_name') or ''
+        summary_name = ((self.summary_data or {}).get('main_header') or {}).get('ind_name') or ''
+        # Try from recommendation data first, fall back to summary data
+        ind_name = rec_name or summary_name
+
+        self._ind_name = ind_name
+        self._ind_name_lc = ind_name.lower()
+        # Check for bank but exclude NBFCs
+        self._is_bank = ('bank' in self._ind_name_lc and 'nbfc' not in self._ind_name_lc
+                         and 'non banking' not in self._ind_name_lc)
+        # Financial if either source names a financial sector
+        self._is_fin_sector = rec_name in _FINANCIAL_SECTORS or summary_name in _FINANCIAL_SECTORS
+
     def _is_bank_stock(self):
         """Check if the stock is a bank based on industry name (excluding NBFCs)"""
-        try:
-            # Try from recommendation data first
-            if self.recommendation_data:
-                main_header = self.recommendation_data.get('main_header', {})
-                ind_name = main_header.get('ind_name', '').lower()
-                if ind_name:
-                    # Check for bank but exclude NBFCs
-                    is_bank = 'bank' in ind_name and 'nbfc' not in ind_name and 'non banking' not in ind_name
-                    return is_bank
-
-            # Fallback to summary data
-            if self.summary_data:
-                main_header = self.summary_data.get('main_header', {})
-                ind_name = main_header.get('ind_name', '').lower()
-                # Check for bank but exclude NBFCs
-                is_bank = 'bank' in ind_name and 'nbfc' not in ind_name and 'non banking' not in ind_name
-                return is_bank
-
-            return False
-        except:
-            return False
+        return self._is_bank
 
     def _is_financial_sector(self):
         """Check if the stock belongs to financial sector (Banks, NBFCs, Insurance, etc.)"""
-        try:
-            # List of exact financial sector industry names
-            financial_sectors = [
-                "Finance",
-                "Housing Finance Company",
-                "Insurance",
-                "Non Banking Financial Company (NBFC)",
-                "Other Bank",
-                "Private Sector Bank",
-                "Public Sector Bank"
-            ]
+        return self._is_fin_sector
 
-            # Try from recommendation data first
-            if self.recommendation_data:
-                main_header = self.recommendation_data.get('main_header', {})
-                ind_name = main_header.get('ind_name', '')
-                if ind_name in financial_sectors:
-                    return True
+    def _post_api(self, url, payload, description):
+        """POST to a ratios API with retry, without requiring main_header"""
+        return post_with_retry(
+            url=url,
+            json_data=payload,
+            description=description,
+            max_retries=5,
+            timeout=30,
+            required_fields=[],  # Don't validate specific fields
+            check_main_header=False  # Don't require main_header for ratios
+        )
 
-            # Fallback to summary data
-            if self.summary_data:
-                main_header = self.summary_data.get('main_header', {})
-                ind_name = main_header.get('ind_name', '')
-                if ind_name in financial_sectors:
-                    return True
+    def _cached_fetch(self, name, fetcher):
+        """Return today's cached API response for this stock, fetching and caching on miss"""
+        cache_file = _CACHE_DIR / f"{name}-{self.stock_id}-{self.exchange}-{date.today():%Y%m%d}.json"
 
-            return False
-        except:
-            return False
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            pass
 
-    def fetch_quality_valuation_data(self):
-        """Fetch Quality and Valuation ratios from APIs"""
-        print("=" * 80)
-        print("FETCHING QUALITY & VALUATION DATA FROM APIS...")
-        print("=" * 80)
+        result = fetcher()
+
+        # Only cache successful responses so failures are retried on the next build
+        if result and str(result.get('code')) == '200' and 'data' in result:
+            try:
+                cache_file.parent.mkdir(parents=True, exist_ok=True)
+                with open(cache_file, 'w', encoding='utf-8') as f:
+                    json.dump(result, f)
+            except OSError as e:
+                logger.warning("Could not write cache %s: %s", cache_file, e)
+
+        return result
 
-        # Fetch Recommendation API (primary source)
-        print(f"[1/2] Fetching recommendation data...")
+    def _fetch_recommendation(self):
+        """POST to the Recommendation API (primary source)"""
         payload = {
             "sid": int(self.stock_id),
             "exchange": self.exchange,
             "fornews": 1
         }
+        return self._cached_fetch(
+            "recommendation",
+            lambda: self._post_api(self.recommendation_api_url, payload, "Recommendation API")
+        )
 
-        result = post_with_retry(
-            url=self.recommendation_api_url,
-            json_data=payload,
-            description="Recommendation API",
-            max_retries=5,
-            timeout=30,
-            required_fields=[],  # Don't validate specific fields
-            check_main_header=False  # Don't require main_header for ratios
+    def _fetch_summary(self):
+        """POST to the Summary API (fallback source)"""
+        payload = {
+            "sid": int(self.stock_id),
+            "exchange": self.exchange
+        }
+        return self._cached_fetch(
+            "summary",
+            lambda: self._post_api(self.summary_api_url, payload, "Summary API")
         )
 
+    def fetch_quality_valuation_data(self):
+        """Fetch Quality and Valuation ratios from APIs"""
+        logger.info("Fetching quality & valuation data for stock %s", self.stock_id)
+
+        # Both APIs are independent and network-bound, so fetch them concurrently
+        logger.debug("[1/2] Fetching recommendation data...")
+        logger.debug("[2/2] Fetching summary data (fallback)...")
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            recommendation_future = executor.submit(self._fetch_recommendation)
+            summary_future = executor.submit(self._fetch_summary)
+            self._apply_api_results(recommendation_future.result(), summary_future.result())
+
+        logger.info("Data fetch complete for stock %s", self.stock_id)
+
+    def _apply_api_results(self, recommendation_result, summary_result):
+        """Populate ratios from the API results, falling back to summary data"""
+        # Recommendation API (primary source)
+        result = recommendation_result
         if result and str(result.get('code')) == '200' and 'data' in result:
             self.recommendation_data = result['data']
 
@@ -110,26 +173,11 @@ class Section6Builder:
             valuation_tbl = self.recommendation_data.get('valuation', {}).get('valuation_tbl', {})
             self.valuation_ratios = valuation_tbl.get('list', [])
 
-            print(f"   Found {len(self.quality_ratios)} quality ratios")
-            print(f"   Found {len(self.valuation_ratios)} valuation ratios")
-
-        # Fetch Summary API (fallback source)
-        print(f"[2/2] Fetching summary data (fallback)...")
-        payload = {
-            "sid": int(self.stock_id),
-            "exchange": self.exchange
-        }
-
-        result = post_with_retry(
-            url=self.summary_api_url,
-            json_data=payload,
-            description="Summary API",
-            max_retries=5,
-            timeout=30,
-            required_fields=[],  # Don't validate specific fields
-            check_main_header=False  # Don't require main_header for ratios
-        )
+            logger.info("Found %d quality ratios", len(self.quality_ratios))
+            logger.info("Found %d valuation ratios", len(self.valuation_ratios))
 
+        # Summary API (fallback source)
+        result = summary_result
         if result and str(result.get('code')) == '200' and 'data' in result:
             self.summary_data = result['data']
 
@@ -137,23 +185,21 @@ class Section6Builder:
             if not self.quality_ratios:
                 quality_tbl = self.summary_data.get('key_factors', {}).get('quality', {}).get('quality_tbl', {})
                 self.quality_ratios = quality_tbl.get('list', [])
-                print(f"   Fallback: Found {len(self.quality_ratios)} quality ratios")
+                logger.info("Fallback: Found %d quality ratios", len(self.quality_ratios))
 
             # If no valuation ratios from recommendation API, try summary
             if not self.valuation_ratios:
                 valuation_tbl = self.summary_data.get('key_factors', {}).get('valuation', {}).get('valuation_tbl', {})
                 self.valuation_ratios = valuation_tbl.get('list', [])
-                print(f"   Fallback: Found {len(self.valuation_ratios)} valuation ratios")
+                logger.info("Fallback: Found %d valuation ratios", len(self.valuation_ratios))
 
-        print("=" * 80)
-        print("DATA FETCH COMPLETE")
-        print("=" * 80)
-        print()
+        self._resolve_industry()
+        self._fetched = True
 
     def _categorize_ratios(self):
         """
         Categorize ratios into subsections based on keywords in ratio names.
-        Returns dictionary with categorized ratios.
+        Returns dictionary of category -> list of (name, value) display tuples.
         """
         categories = {
             'profitability': [],
@@ -161,56 +207,59 @@ class Section6Builder:
             'leverage': [],
             'efficiency': [],
             'valuation': [],
-            'banking': [],  # Special category for bank-specific ratios
+            'banking_profit': [],  # Bank ratios shown under profitability (NIM, ROE, ...)
+            'banking_other': [],  # Bank-specific metrics (NPA, CASA, ...)
             'other': []
         }
 
-        # Categorize quality ratios
+        # Categorize quality ratios (tax, dividend, payout and unmatched go to 'other')
         for ratio in self.quality_ratios:
             name = ratio.get('name', '').lower()
-
-            # Banking-specific ratios
-            if any(keyword in name for keyword in ['npa', 'gnpa', 'nnpa', 'car', 'nim', 'casa', 'advances', 'deposits']):
-                categories['banking'].append(ratio)
-            # Profitability indicators
-            elif any(keyword in name for keyword in ['roe', 'roa', 'roce', 'margin', 'profit']):
-                categories['profitability'].append(ratio)
-            # Growth indicators
-            elif any(keyword in name for keyword in ['growth', 'cagr']):
-                categories['growth'].append(ratio)
-            # Leverage indicators
-            elif any(keyword in name for keyword in ['debt', 'interest', 'ebitda', 'coverage']):
-                categories['leverage'].append(ratio)
-            # Efficiency indicators
-            elif any(keyword in name for keyword in ['capital employed', 'turnover', 'asset', 'working capital']):
-                categories['efficiency'].append(ratio)
-            # Tax and payout
-            elif any(keyword in name for keyword in ['tax', 'dividend', 'payout']):
-                categories['other'].append(ratio)
+            entry = self._ratio_entry(ratio)
+
+            for category, pattern in _CATEGORY_PATTERNS:
+                if pattern.search(name):
+                    if category == 'banking':
+                        category = 'banking_profit' if _BANKING_PROFIT_PATTERN.search(name) else 'banking_other'
+                    categories[category].append(entry)
+                    break
             else:
-                categories['other'].append(ratio)
+                categories['other'].append(entry)
 
         # All valuation ratios go to valuation category
-        categories['valuation'] = self.valuation_ratios
+        categories['valuation'] = [self._ratio_entry(ratio) for ratio in self.valuation_ratios]
 
         return categories
 
-    def _format_ratio_line(self, ratio_name, ratio_value, max_width=42):
-        """Format a ratio line with proper alignment"""
-        # Ensure value is not None
-        if ratio_value is None or ratio_value == '':
-            ratio_value = 'N/A'
-
-        # Calculate spacing
-        name_width = max_width - len(str(ratio_value))
-        formatted_name = ratio_name.ljust(name_width)
+    def _ratio_entry(self, ratio):
+        """Unpack a ratio into a (name, value) display tuple, defaulting missing values to N/A"""
+        value = ratio.get('value', 'N/A')
+        if value is None or value == '':
+            value = 'N/A'
+        return ratio.get('name', 'N/A'), str(value)
 
-        return f"{formatted_name}{ratio_value}"
+    def _format_ratio_line(self, ratio_name, ratio_value, max_width=42):
+        """Format a ratio line with proper alignment (value already defaulted by _ratio_entry)"""
+        # Pad the name so the value ends at max_width (never negative)
+        name_width = max(max_width - len(ratio_value), 0)
+        return f"{ratio_name:<{name_width}}{ratio_value}"
+
+    def _emit_group(self, title, ratios):
+        """Yield a titled group of ratio lines followed by two blank lines"""
+        fmt = self._format_ratio_line
+        yield title
+        yield "-" * len(title)
+        yield ""
+        for name, value in ratios:
+            yield fmt(name, value)
+        yield ""
+        yield ""
 
     def build_section(self):
         """Build SECTION 6 from Quality and Valuation data"""
-        # Fetch data first
-        self.fetch_quality_valuation_data()
+        # Fetch data first (build_many may have fetched it already)
+        if not self._fetched:
+            self.fetch_quality_valuation_data()
 
         # Categorize ratios
         categories = self._categorize_ratios()
@@ -218,140 +267,86 @@ class Section6Builder:
         # Check if this is a bank stock
         is_bank = self._is_bank_stock()
 
-        # Build output
-        lines = []
-        lines.append("=" * 80)
-        lines.append("SECTION 6: KEY FINANCIAL RATIOS & METRICS")
-        lines.append("=" * 80)
-        lines.append("")
-        lines.append("")
-        lines.append("")
-
-        # PROFITABILITY RATIOS
-        if categories['profitability'] or (is_bank and categories['banking']):
-            lines.append("PROFITABILITY RATIOS")
-            lines.append("-" * 20)
-            lines.append("")
-
-            # For banks, show banking ratios first
-            if is_bank and categories['banking']:
-                for ratio in categories['banking']:
-                    # Filter for profitability-related banking ratios
-                    name = ratio.get('name', '').lower()
-                    if any(keyword in name for keyword in ['nim', 'roe', 'roa', 'roce']):
-                        ratio_line = self._format_ratio_line(ratio.get('name', 'N/A'), ratio.get('value', 'N/A'))
-                        lines.append(ratio_line)
-
-            # Add general profitability ratios
-            for ratio in categories['profitability']:
-                ratio_line = self._format_ratio_line(ratio.get('name', 'N/A'), ratio.get('value', 'N/A'))
-                lines.append(ratio_line)
-
-            if not categories['profitability'] and not (is_bank and categories['banking']):
-                lines.append("No profitability ratios available")
-
-            lines.append("")
-            lines.append("")
+        # Header
+        groups = [(
+            "=" * 80,
+            "SECTION 6: KEY FINANCIAL RATIOS & METRICS",
+            "=" * 80,
+            "",
+            "",
+            "",
+        )]
+
+        # Banking ratios are only shown for bank stocks
+        banking_profit = categories['banking_profit'] if is_bank else []
+        banking_other = categories['banking_other'] if is_bank else []
+
+        # PROFITABILITY RATIOS (for banks, profitability-related banking ratios first)
+        if categories['profitability'] or banking_profit or banking_other:
+            groups.append(self._emit_group(
+                "PROFITABILITY RATIOS", itertools.chain(banking_profit, categories['profitability'])
+            ))
 
         # GROWTH RATIOS
         if categories['growth']:
-            lines.append("GROWTH RATIOS")
-            lines.append("-" * 13)
-            lines.append("")
-
-            for ratio in categories['growth']:
-                ratio_line = self._format_ratio_line(ratio.get('name', 'N/A'), ratio.get('value', 'N/A'))
-                lines.append(ratio_line)
-
-            lines.append("")
-            lines.append("")
+            groups.append(self._emit_group("GROWTH RATIOS", categories['growth']))
 
         # LEVERAGE & SOLVENCY (Only for non-financial sector stocks)
         # Financial sector stocks (Banks, NBFCs, Insurance, Housing Finance) should not show debt metrics
         if not self._is_financial_sector() and categories['leverage']:
-            lines.append("LEVERAGE & SOLVENCY")
-            lines.append("-" * 19)
-            lines.append("")
-
-            for ratio in categories['leverage']:
-                ratio_line = self._format_ratio_line(ratio.get('name', 'N/A'), ratio.get('value', 'N/A'))
-                lines.append(ratio_line)
-
-            lines.append("")
-            lines.append("")
+            groups.append(self._emit_group("LEVERAGE & SOLVENCY", categories['leverage']))
 
         # EFFICIENCY RATIOS
         if categories['efficiency']:
-            lines.append("EFFICIENCY RATIOS")
-            lines.append("-" * 17)
-            lines.append("")
-
-            for ratio in categories['efficiency']:
-                ratio_line = self._format_ratio_line(ratio.get('name', 'N/A'), ratio.get('value', 'N/A'))
-                lines.append(ratio_line)
-
-            lines.append("")
-            lines.append("")
+            groups.append(self._emit_group("EFFICIENCY RATIOS", categories['efficiency']))
 
         # BANKING-SPECIFIC METRICS (For banks only, non-profitability metrics)
-        if is_bank and categories['banking']:
-            # Check if there are non-profitability banking ratios
-            non_profit_banking = [r for r in categories['banking']
-                                 if not any(kw in r.get('name', '').lower() for kw in ['nim', 'roe', 'roa', 'roce'])]
-
-            if non_profit_banking:
-                lines.append("BANKING-SPECIFIC METRICS")
-                lines.append("-" * 24)
-                lines.append("")
-
-                for ratio in non_profit_banking:
-                    ratio_line = self._format_ratio_line(ratio.get('name', 'N/A'), ratio.get('value', 'N/A'))
-                    lines.append(ratio_line)
-
-                lines.append("")
-                lines.append("")
+        if banking_other:
+            groups.append(self._emit_group("BANKING-SPECIFIC METRICS", banking_other))
 
         # VALUATION METRICS
         if categories['valuation']:
-            lines.append("VALUATION METRICS")
-            lines.append("-" * 17)
-            lines.append("")
-
-            for ratio in categories['valuation']:
-                ratio_line = self._format_ratio_line(ratio.get('name', 'N/A'), ratio.get('value', 'N/A'))
-                lines.append(ratio_line)
-
-            lines.append("")
-            lines.append("")
+            groups.append(self._emit_group("VALUATION METRICS", categories['valuation']))
 
         # OTHER METRICS (Tax, Dividend Payout, etc.)
         if categories['other']:
-            lines.append("OTHER METRICS")
-            lines.append("-" * 13)
-            lines.append("")
+            groups.append(self._emit_group("OTHER METRICS", categories['other']))
 
-            for ratio in categories['other']:
-                ratio_line = self._format_ratio_line(ratio.get('name', 'N/A'), ratio.get('value', 'N/A'))
-                lines.append(ratio_line)
+        return "\n".join(itertools.chain.from_iterable(groups))
 
-            lines.append("")
-            lines.append("")
+    @classmethod
+    def build_many(cls, stock_ids, exchange=0, max_workers=16):
+        """
+        Build SECTION 6 for many stocks, fanning out all API calls on one shared pool.
+        Returns dictionary of stock_id -> section text.
+        """
+        builders = [cls(stock_id, exchange) for stock_id in stock_ids]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = [
+                (builder, executor.submit(builder._fetch_recommendation), executor.submit(builder._fetch_summary))
+                for builder in builders
+            ]
+            for builder, recommendation_future, summary_future in pending:
+                builder._apply_api_results(recommendation_future.result(), summary_future.result())
 
-        return "\n".join(lines)
+        return {builder.stock_id: builder.build_section() for builder in builders}
 
-    def save_to_file(self, output_file):
-        """Build section and save to file"""
-        section_text = self.build_section()
+    def save_to_file(self, output_file, section_text=None):
+        """Save section to file, building it only if section_text is not given"""
+        if section_text is None:
+            section_text = self.build_section()
 
         with open(output_file, 'w', encoding='utf-8') as f:
             f.write(section_text)
 
-        print(f"\n[OK] Section 6 saved to: {output_file}")
+        logger.info("Section 6 saved to: %s", output_file)
         return section_text
 
 
 def main():
     """Test the Section 6 builder"""
+    logging.basicConfig(level=logging.INFO)
     stock_id = 513374  # TCS
 
     print("=" * 80)
@@ -362,11 +357,11 @@ def main():
     builder = Section6Builder(stock_id)
     section_text = builder.build_section()
 
-    # Save to file
-    builder.save_to_file("section6_output.txt")
+    # Save to file (reuse the built text instead of re-fetching for each file)
+    builder.save_to_file("section6_output.txt", section_text=section_text)
 
     output_file = f"section6_stock_{stock_id}.txt"
-    builder.save_to_file(output_file)
+    builder.save_to_file(output_file, section_text=section_text)
 
     print("\n" + "=" * 80)
     print("SECTION 6 OUTPUT SAVED")
@@ -2,180 +2,487 @@
 SECTION 7: VALUATION METRICS Builder
 Dynamically builds valuation metrics using API data
 """
-import requests
+import asyncio
+import atexit
 import json
+import logging
+import os
 import re
+import threading
+import time
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
+import requests
+from api_utils import create_session
+
+logger = logging.getLogger(__name__)
 
 # Try importing MongoDB handler
 try:
     from mongodb_handler import MongoDBHandler
     MONGODB_AVAILABLE = True
 except ImportError:
-    print("[WARNING] MongoDB handler not available. Valuation history will not be fetched.")
+    logger.warning("MongoDB handler not available. Valuation history will not be fetched.")
     MONGODB_AVAILABLE = False
 
+# Try importing Redis for the API response cache (enabled only when REDIS_URL is set)
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# Try importing httpx with HTTP/2 support so the four API calls can share one multiplexed connection
+try:
+    import httpx
+    import h2  # noqa: F401 - required by httpx for http2=True
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+# Dividend parsing patterns
+_DIV_STRONG_RE = re.compile(r'<strong>(\d+)%</strong>')
+_EX_DATE_TXT_RE = re.compile(r'ex-date:\s*(\d+\s+\w+\s+\d+)')
+# Return-API suffixes say "latest dividend:", the tot_returns sentence says "Latest dividend:"
+_DIV_LATEST_RE = re.compile(r'latest dividend:\s*([\d.]+)')
+_DIV_LATEST_SENTENCE_RE = re.compile(r'Latest dividend:\s*([\d.]+)')
+_EX_DATE_RE = re.compile(r'ex-dividend date:\s*([\w]+-\d+-\d+)')
+
+# Cache TTLs in seconds per endpoint: price moves fast, returns change slowly
+_CACHE_TTL = {
+    'recommendation': 300,
+    'summary': 300,
+    'pricemovement': 30,
+    'return': 900,
+}
+# Last good response is kept this long as a fallback when the upstream API fails
+_STALE_TTL = 24 * 60 * 60
+
+# Returned when every API fetch fails and no previously built section is cached
+_SECTION7_UNAVAILABLE = "ERROR: Failed to fetch valuation data"
+
+_NL = b"\n"
+
+
+class _CircuitBreaker:
+    """
+    Fail fast on an endpoint after fail_max consecutive failures. The circuit stays
+    open for reset_timeout seconds, then lets a single trial request through while
+    every other caller is still rejected; the trial's outcome closes the circuit
+    or opens it again.
+    """
+
+    def __init__(self, fail_max=3, reset_timeout=60):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = {}
+        self._opened_at = {}
+        self._trials = set()
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        with self._lock:
+            opened_at = self._opened_at.get(key)
+            if opened_at is None:
+                return True
+            if key in self._trials or time.monotonic() - opened_at < self.reset_timeout:
+                return False
+            # Half-open: let this caller through as the only trial request
+            self._trials.add(key)
+            return True
+
+    def record_success(self, key):
+        with self._lock:
+            self._failures.pop(key, None)
+            self._opened_at.pop(key, None)
+            self._trials.discard(key)
+
+    def record_failure(self, key):
+        with self._lock:
+            if key in self._trials:
+                # Failed trial: open the circuit for another reset_timeout
+                self._trials.discard(key)
+                self._failures[key] = self.fail_max
+                self._opened_at[key] = time.monotonic()
+                return
+            failures = self._failures.get(key, 0) + 1
+            self._failures[key] = failures
+            if failures >= self.fail_max:
+                self._opened_at[key] = time.monotonic()
+
+def _is_upstream_failure(exc):
+    """
+    True if exc means the endpoint itself is unhealthy (a transport error or a 5xx
+    response). A 4xx for one bad stock id or a malformed payload says nothing about
+    the endpoint, so it must not trip the breaker shared by every stock.
+    """
+    status = getattr(getattr(exc, 'response', None), 'status_code', None)
+    if status is not None:
+        return status >= 500
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    return HTTPX_AVAILABLE and isinstance(exc, httpx.TransportError)
+
+_REDIS_CLIENT = None
+
+def _get_redis():
+    """Return the shared Redis client, or None if caching is not configured"""
+    global _REDIS_CLIENT
+    if _REDIS_CLIENT is None and REDIS_AVAILABLE and os.getenv('REDIS_URL'):
+        _REDIS_CLIENT = redis.Redis.from_url(os.getenv('REDIS_URL'))
+    return _REDIS_CLIENT
+
+_MONGO_HANDLER = None
+
+def _get_mongo():
+    """Return the process-wide MongoDBHandler, connecting on first use"""
+    global _MONGO_HANDLER
+    if _MONGO_HANDLER is None:
+        _MONGO_HANDLER = MongoDBHandler()
+    return _MONGO_HANDLER
+
+@atexit.register
+def _close_mongo():
+    if _MONGO_HANDLER is not None:
+        _MONGO_HANDLER.close()
+
+def _to_float(value):
+    """Parse a price string like "3,050.50" to float, or None if it is not numeric"""
+    try:
+        return float(str(value).replace(',', ''))
+    except ValueError:
+        return None
+
+# Row labels padded once so every value starts in the same column
+_LABEL_WIDTH = 38
+_L_PE = "P/E Ratio (TTM):".ljust(_LABEL_WIDTH)
+_L_PBV = "Price to Book Value (P/BV):".ljust(_LABEL_WIDTH)
+_L_EV_EBITDA = "EV/EBITDA:".ljust(_LABEL_WIDTH)
+_L_EV_EBIT = "EV/EBIT:".ljust(_LABEL_WIDTH)
+_L_EV_SALES = "EV/Sales:".ljust(_LABEL_WIDTH)
+_L_EV_CE = "EV/Capital Employed:".ljust(_LABEL_WIDTH)
+_L_PEG = "PEG Ratio:".ljust(_LABEL_WIDTH)
+_L_DIV_YIELD = "Dividend Yield:".ljust(_LABEL_WIDTH)
+_L_LATEST_DIV = "Latest Dividend:".ljust(_LABEL_WIDTH)
+_L_EX_DATE = "Ex-Dividend Date:".ljust(_LABEL_WIDTH)
+_L_DIV_PAYOUT = "Dividend Payout:".ljust(_LABEL_WIDTH)
+_L_OVERALL = "Overall Valuation:".ljust(_LABEL_WIDTH)
+_L_GRADE_HISTORY = "Valuation Grade History:".ljust(_LABEL_WIDTH)
+_L_52W_HIGH = "52-Week High:".ljust(_LABEL_WIDTH)
+_L_52W_LOW = "52-Week Low:".ljust(_LABEL_WIDTH)
+_L_DIST_HIGH = "Current Distance from High:".ljust(_LABEL_WIDTH)
+_L_DIST_LOW = "Current Distance from Low:".ljust(_LABEL_WIDTH)
+
+# Valuation multiples: (API field names in priority order, row label, value suffix)
+_VAL_ROWS = (
+    (("P/E Ratio",), _L_PE, "x"),
+    (("Price to Book Value", "Price to Book"), _L_PBV, "x"),
+    (("EV to EBITDA",), _L_EV_EBITDA, "x"),
+    (("EV to EBIT",), _L_EV_EBIT, "x"),
+    (("EV to Sales",), _L_EV_SALES, "x"),
+    (("EV to Capital Employed",), _L_EV_CE, "x"),
+    (("PEG Ratio",), _L_PEG, "x"),
+)
+
+def _row(label, value, suffix="", prefix="", missing="N/A"):
+    """Format a line from a padded _L_* label and its value, or missing if the value is empty"""
+    if value:
+        return f"{label}{prefix}{value}{suffix}"
+    return label + missing
+
+@lru_cache(maxsize=64)
+def _parse_short_date(curr_date, year):
+    """Convert a pricemovement date like "Oct 16" to "16-Oct-2025" (raises ValueError if unparseable)"""
+    return datetime.strptime(f"{curr_date} {year}", "%b %d %Y").strftime("%d-%b-%Y")
+
 class Section7Builder:
+    # Shared across builders so all four APIs (same host) reuse pooled keep-alive connections.
+    # When httpx + h2 are installed, requests go over a single HTTP/2 connection instead.
+    _session = create_session(pool_connections=4, pool_maxsize=8, retries=2)
+    # Shared per endpoint so a known-down API is skipped by every builder until it recovers;
+    # the session retries above absorb transient 5xx errors before they count as failures
+    _breaker = _CircuitBreaker(fail_max=3, reset_timeout=60)
+    _http2_client = None
+    if HTTPX_AVAILABLE:
+        _http2_client = httpx.Client(
+            timeout=30,
+            transport=httpx.HTTPTransport(
+                http2=True,
+                retries=2,
+                limits=httpx.Limits(max_keepalive_connections=8, max_connections=16),
+            ),
+        )
+
     def __init__(self, stock_id, exchange=0, use_mongodb=True):
         self.stock_id = str(stock_id)
         self.exchange = exchange
+        self._sid_int = int(stock_id)
+        # Request body shared by the POST APIs
+        self._base_payload = {"sid": self._sid_int, "exchange": exchange}
         self.recommendation_api_url = "https://frapi.marketsmojo.com/apiv1/recommendation/getRecoData"
         self.summary_api_url = "https://frapi.marketsmojo.com/apiv1/stocksummary/getStockSummary"
         self.pricemovement_api_url = "https://frapi.marketsmojo.com/apiv1/price/priceupdates"
-        self.return_api_url = f"https://frapi.marketsmojo.com/stocks_Returnanalysis/returnAnalysis?se=&cardlist=&period=&alphabet=&sid={stock_id}&exchange={exchange}&page=1&cards=4&1y&cid=34"
+        self.return_api_url = f"https://frapi.marketsmojo.com/stocks_Returnanalysis/returnAnalysis?se=&cardlist=&period=&alphabet=&sid={self._sid_int}&exchange={exchange}&page=1&cards=4&1y&cid=34"
 
         self.recommendation_data = {}
         self.summary_data = {}
         self.pricemovement_data = {}
         self.return_data = {}
 
+        # Year used to complete the "Oct 16" style dates from the pricemovement API
+        self._year = datetime.now().year
+
         # Will import from Section 6 if needed
         self.dividend_payout = None
 
-        # MongoDB handler for valuation history
+        # Lookups derived from the API data, built lazily and reset by fetch_all_data
+        self._valuation_index = None
+        self._quality_index = None
+        self._52w_range = None
+        self._52w_floats = (None, None)
+        self._cmp_float = None
+
+        # MongoDB handler for valuation history (shared by all builders in the process)
         self.use_mongodb = use_mongodb and MONGODB_AVAILABLE
         self.mongo_handler = None
         if self.use_mongodb:
             try:
-                self.mongo_handler = MongoDBHandler()
+                self.mongo_handler = _get_mongo()
             except Exception as e:
-                print(f"[WARNING] MongoDB connection failed: {e}")
+                logger.warning("MongoDB connection failed: %s", e)
                 self.use_mongodb = False
 
+    def _cached_fetch(self, endpoint, fetcher):
+        """
+        Return the API result for endpoint from Redis, calling fetcher on a miss.
+        If fetcher fails or the endpoint's circuit is open, fall back to the last
+        good (stale) result when one is cached.
+        """
+        cache = _get_redis()
+        key = f"section7:{endpoint}:{self.stock_id}:{self.exchange}"
+
+        if cache is not None:
+            try:
+                cached = cache.get(key)
+                if cached:
+                    return json.loads(cached)
+            except redis.RedisError as e:
+                logger.warning("Redis cache read failed: %s", e)
+
+        try:
+            if not self._breaker.allow(endpoint):
+                raise RuntimeError(f"{endpoint} API circuit open, skipping request")
+            try:
+                result = fetcher()
+            except Exception as e:
+                if _is_upstream_failure(e):
+                    self._breaker.record_failure(endpoint)
+                else:
+                    # The endpoint answered; the error is specific to this request
+                    self._breaker.record_success(endpoint)
+                raise
+            self._breaker.record_success(endpoint)
+        except Exception:
+            stale = None
+            if cache is not None:
+                try:
+                    stale = cache.get(f"{key}:stale")
+                except redis.RedisError:
+                    pass
+            if stale:
+                logger.warning("%s API failed, using stale cached copy", endpoint)
+                return json.loads(stale)
+            raise
+
+        # Only cache successful responses
+        if cache is not None and str(result.get('code')) == '200' and 'data' in result:
+            try:
+                serialized = json.dumps(result)
+                cache.setex(key, _CACHE_TTL[endpoint], serialized)
+                cache.setex(f"{key}:stale", _STALE_TTL, serialized)
+            except redis.RedisError as e:
+                logger.warning("Redis cache write failed: %s", e)
+
+        return result
+
+    def _last_good_key(self):
+        return f"section7:{self.stock_id}:last_good"
+
+    def _load_last_good_section(self):
+        """Return the last successfully built section from Redis, or None"""
+        cache = _get_redis()
+        if cache is None:
+            return None
+        try:
+            cached = cache.get(self._last_good_key())
+        except redis.RedisError as e:
+            logger.warning("Redis cache read failed: %s", e)
+            return None
+        return cached.decode('utf-8') if cached else None
+
+    def _store_last_good_section(self, section_text):
+        """Keep the built section in Redis as a fallback for API outages"""
+        cache = _get_redis()
+        if cache is None:
+            return
+        try:
+            cache.setex(self._last_good_key(), _STALE_TTL, section_text)
+        except redis.RedisError as e:
+            logger.warning("Redis cache write failed: %s", e)
+
+    def _post_json(self, url, payload):
+        """POST payload and return the decoded JSON response"""
+        if self._http2_client is not None:
+            response = self._http2_client.post(url, json=payload)
+        else:
+            response = self._session.post(url, json=payload, timeout=30)
+        response.raise_for_status()
+        return response.json()
+
+    def _get_json(self, url):
+        """GET url and return the decoded JSON response"""
+        if self._http2_client is not None:
+            response = self._http2_client.get(url)
+        else:
+            response = self._session.get(url, timeout=30)
+        response.raise_for_status()
+        return response.json()
+
     def fetch_recommendation_data(self):
         """Fetch recommendation data for valuation multiples"""
-        print(f"[1/3] Fetching recommendation data...")
+        logger.debug("[1/4] Fetching recommendation data...")
 
         try:
-            payload = {
-                "sid": int(self.stock_id),
-                "exchange": self.exchange,
-                "fornews": 1
-            }
+            payload = {**self._base_payload, "fornews": 1}
 
-            response = requests.post(self.recommendation_api_url, json=payload, timeout=30)
-            response.raise_for_status()
-            result = response.json()
+            result = self._cached_fetch(
+                'recommendation', lambda: self._post_json(self.recommendation_api_url, payload)
+            )
 
             if result.get('code') == '200' and 'data' in result:
                 self.recommendation_data = result['data']
-                print(f"[OK] Recommendation API successful")
+                logger.debug("Recommendation API successful")
                 return True
         except Exception as e:
-            print(f"[WARNING] Recommendation API failed: {e}")
+            logger.warning("Recommendation API failed: %s", e)
 
         return False
 
     def fetch_summary_data(self):
         """Fetch summary data for dividend, 52-week range"""
-        print(f"[2/3] Fetching summary data...")
+        logger.debug("[2/4] Fetching summary data...")
 
         try:
-            payload = {
-                "sid": int(self.stock_id),
-                "exchange": self.exchange
-            }
-
-            response = requests.post(self.summary_api_url, json=payload, timeout=30)
-            response.raise_for_status()
-            result = response.json()
+            result = self._cached_fetch(
+                'summary', lambda: self._post_json(self.summary_api_url, self._base_payload)
+            )
 
             if result.get('code') == '200' and 'data' in result:
                 self.summary_data = result['data']
-                print(f"[OK] Summary API successful")
+                logger.debug("Summary API successful")
                 return True
         except Exception as e:
-            print(f"[WARNING] Summary API failed: {e}")
+            logger.warning("Summary API failed: %s", e)
 
         return False
 
     def fetch_pricemovement_data(self):
         """Fetch price movement data for current price"""
-        print(f"[3/4] Fetching price movement data...")
+        logger.debug("[3/4] Fetching price movement data...")
 
         try:
-            payload = {
-                "sid": int(self.stock_id),
-                "exchange": self.exchange
-            }
-
-            response = requests.post(self.pricemovement_api_url, json=payload, timeout=30)
-            response.raise_for_status()
-            result = response.json()
+            result = self._cached_fetch(
+                'pricemovement', lambda: self._post_json(self.pricemovement_api_url, self._base_payload)
+            )
 
             if result.get('code') == '200' and 'data' in result:
                 self.pricemovement_data = result['data']
-                print(f"[OK] Price movement API successful")
+                logger.debug("Price movement API successful")
                 return True
         except Exception as e:
-            print(f"[WARNING] Price movement API failed: {e}")
+            logger.warning("Price movement API failed: %s", e)
 
         return False
 
     def fetch_return_data(self):
         """Fetch return analysis data for dividend information"""
-        print(f"[4/4] Fetching return analysis data...")
+        logger.debug("[4/4] Fetching return analysis data...")
 
         try:
-            response = requests.get(self.return_api_url, timeout=30)
-            response.raise_for_status()
-            result = response.json()
+            result = self._cached_fetch('return', lambda: self._get_json(self.return_api_url))
 
             code = str(result.get('code'))
             if code == '200' and 'data' in result:
                 self.return_data = result['data']
-                print(f"[OK] Return analysis API successful")
+                logger.debug("Return analysis API successful")
                 return True
         except Exception as e:
-            print(f"[WARNING] Return analysis API failed: {e}")
+            logger.warning("Return analysis API failed: %s", e)
 
         return False
 
+    def _prepare_fetch(self):
+        """Invalidate lookups derived from previously fetched data and return the four fetchers"""
+        self._valuation_index = None
+        self._quality_index = None
+        self._52w_range = None
+        self._52w_floats = (None, None)
+        self._cmp_float = None
+
+        # The four APIs are independent and network-bound, so they are fetched concurrently;
+        # each fetcher only sets its own *_data attribute
+        return (
+            self.fetch_recommendation_data,
+            self.fetch_summary_data,
+            self.fetch_pricemovement_data,
+            self.fetch_return_data,
+        )
+
     def fetch_all_data(self):
         """Fetch all required data"""
-        print("=" * 80)
-        print("FETCHING DATA FROM 4 APIS...")
-        print("=" * 80)
+        logger.info("Fetching valuation data for stock %s", self.stock_id)
+
+        fetchers = self._prepare_fetch()
+        with ThreadPoolExecutor(max_workers=len(fetchers)) as executor:
+            futures = [executor.submit(fetcher) for fetcher in fetchers]
+            wait(futures)
+
+        logger.info("Data fetch complete for stock %s", self.stock_id)
+
+    async def fetch_all_data_async(self):
+        """Fetch all required data without blocking the event loop"""
+        logger.info("Fetching valuation data for stock %s", self.stock_id)
 
-        self.fetch_recommendation_data()
-        self.fetch_summary_data()
-        self.fetch_pricemovement_data()
-        self.fetch_return_data()
+        await asyncio.gather(*(asyncio.to_thread(fetcher) for fetcher in self._prepare_fetch()))
 
-        print("=" * 80)
-        print("DATA FETCH COMPLETE")
-        print("=" * 80)
-        print()
+        logger.info("Data fetch complete for stock %s", self.stock_id)
 
     def _extract_from_valuation_api(self, field_name):
         """Extract field from recommendation or summary API valuation tables"""
-        # Try recommendation API first
-        if self.recommendation_data:
-            valuation_tbl = self.recommendation_data.get('valuation', {}).get('valuation_tbl', {})
-            valuation_list = valuation_tbl.get('list', [])
-            for item in valuation_list:
-                if item.get('name') == field_name:
-                    return item.get('value')
+        if self._valuation_index is None:
+            # Index name -> value once; setdefault keeps the first source in priority order:
+            # recommendation API, then summary API, then the summary DNA section
+            index = {}
+            if self.recommendation_data:
+                valuation_tbl = self.recommendation_data.get('valuation', {}).get('valuation_tbl', {})
+                for item in valuation_tbl.get('list', []):
+                    index.setdefault(item.get('name'), item.get('value'))
 
-        # Fallback to summary API
-        if self.summary_data:
-            valuation_tbl = self.summary_data.get('key_factors', {}).get('valuation', {}).get('valuation_tbl', {})
-            valuation_list = valuation_tbl.get('list', [])
-            for item in valuation_list:
-                if item.get('name') == field_name:
-                    return item.get('value')
+            if self.summary_data:
+                valuation_tbl = self.summary_data.get('key_factors', {}).get('valuation', {}).get('valuation_tbl', {})
+                for item in valuation_tbl.get('list', []):
+                    index.setdefault(item.get('name'), item.get('value'))
 
-        # Fallback to DNA section for some fields
-        if self.summary_data:
-            dna_list = self.summary_data.get('dna', {}).get('list', [])
-            for item in dna_list:
-                if item.get('field') == field_name:
-                    return item.get('value')
+                for item in self.summary_data.get('dna', {}).get('list', []):
+                    index.setdefault(item.get('field'), item.get('value'))
 
-        return None
+            self._valuation_index = index
+
+        return self._valuation_index.get(field_name)
 
     def _get_current_price_and_date(self):
-        """Get current price and date"""
+        """Get current price and date (the parsed price is kept on self._cmp_float)"""
         # Try pricemovement API first
         if self.pricemovement_data:
             main_header = self.pricemovement_data.get('main_header', {})
@@ -183,43 +490,42 @@ class Section7Builder:
             curr_date = main_header.get('curr_date', '')
 
             if cmp and curr_date:
+                self._cmp_float = _to_float(cmp)
                 # Parse date - format is "Oct 16"
                 try:
                     # Add current year
-                    curr_year = datetime.now().year
-                    date_str = f"{curr_date} {curr_year}"
-                    parsed_date = datetime.strptime(date_str, "%b %d %Y")
-                    formatted_date = parsed_date.strftime("%d-%b-%Y")
-                    return cmp, formatted_date
-                except:
+                    return cmp, _parse_short_date(curr_date, self._year)
+                except ValueError:
                     return cmp, curr_date
 
         # Fallback to summary API
         if self.summary_data:
             main_header = self.summary_data.get('main_header', {})
-            return main_header.get('cmp', 'N/A'), main_header.get('curr_date', 'N/A')
+            cmp = main_header.get('cmp', 'N/A')
+            self._cmp_float = _to_float(cmp)
+            return cmp, main_header.get('curr_date', 'N/A')
 
+        self._cmp_float = None
         return 'N/A', 'N/A'
 
     def _get_dividend_payout(self):
         """Get dividend payout - try to extract from Section 6 or quality table"""
-        # Try recommendation API quality table
-        if self.recommendation_data:
-            quality_tbl = self.recommendation_data.get('quality', {}).get('quality_tbl', {})
-            quality_list = quality_tbl.get('list', [])
-            for item in quality_list:
-                if item.get('name') == 'Dividend Payout Ratio':
-                    return item.get('value')
+        if self._quality_index is None:
+            # Recommendation API quality table first, then summary API (first match wins)
+            index = {}
+            if self.recommendation_data:
+                quality_tbl = self.recommendation_data.get('quality', {}).get('quality_tbl', {})
+                for item in quality_tbl.get('list', []):
+                    index.setdefault(item.get('name'), item.get('value'))
 
-        # Fallback to summary API
-        if self.summary_data:
-            quality_tbl = self.summary_data.get('key_factors', {}).get('quality', {}).get('quality_tbl', {})
-            quality_list = quality_tbl.get('list', [])
-            for item in quality_list:
-                if item.get('name') == 'Dividend Payout Ratio':
-                    return item.get('value')
+            if self.summary_data:
+                quality_tbl = self.summary_data.get('key_factors', {}).get('quality', {}).get('quality_tbl', {})
+                for item in quality_tbl.get('list', []):
+                    index.setdefault(item.get('name'), item.get('value'))
 
-        return None
+            self._quality_index = index
+
+        return self._quality_index.get('Dividend Payout Ratio')
 
     def _parse_dividend_info(self):
         """Parse dividend information from corporate actions"""
@@ -235,7 +541,7 @@ class Section7Builder:
                         dt = latest_div.get('dt', '')
 
                         # Parse dividend percentage from text like "1100%"
-                        match = re.search(r'<strong>(\d+)%</strong>', txt)
+                        match = _DIV_STRONG_RE.search(txt)
                         if match:
                             div_percent = int(match.group(1))
                             # Assuming face value is Rs.1, dividend per share = div_percent / 100
@@ -244,13 +550,13 @@ class Section7Builder:
                             # Parse ex-date
                             if dt:
                                 try:
-                                    parsed_date = datetime.strptime(dt, "%Y-%m-%d")
+                                    parsed_date = datetime.fromisoformat(dt)
                                     formatted_ex_date = parsed_date.strftime("%b-%d-%Y")
-                                except:
+                                except (ValueError, TypeError):
                                     formatted_ex_date = dt
                             else:
                                 # Try to extract from text
-                                ex_match = re.search(r'ex-date:\s*(\d+\s+\w+\s+\d+)', txt)
+                                ex_match = _EX_DATE_TXT_RE.search(txt)
                                 if ex_match:
                                     formatted_ex_date = ex_match.group(1)
                                 else:
@@ -260,7 +566,7 @@ class Section7Builder:
                             return f"Rs.{div_per_share:.2f}", formatted_ex_date
 
             return None, None
-        except:
+        except (AttributeError, KeyError, TypeError):
             return None, None
 
     def _parse_dividend_from_return_api(self):
@@ -276,8 +582,8 @@ class Section7Builder:
                 # Look for dividend message
                 if 'Dividend Yield' in prefix or 'dividend' in suffix.lower():
                     # suffix format: "latest dividend: 2.7 per share ex-dividend date: Mar-07-2025"
-                    div_match = re.search(r'latest dividend:\s*([\d.]+)', suffix)
-                    date_match = re.search(r'ex-dividend date:\s*([\w]+-\d+-\d+)', suffix)
+                    div_match = _DIV_LATEST_RE.search(suffix)
+                    date_match = _EX_DATE_RE.search(suffix)
 
                     if div_match:
                         div_value = div_match.group(1)
@@ -285,12 +591,20 @@ class Section7Builder:
                         return f"Rs.{div_value}", ex_date
 
             return None, None
-        except Exception as e:
-            print(f"[WARNING] Error parsing dividend from return API: {e}")
+        except (AttributeError, TypeError) as e:
+            logger.warning("Error parsing dividend from return API: %s", e)
             return None, None
 
     def _get_52week_range(self):
-        """Get 52-week high and low"""
+        """Get 52-week high and low (computed once per fetch)"""
+        if self._52w_range is None:
+            self._52w_range = self._find_52week_range()
+            high, low = self._52w_range
+            self._52w_floats = (_to_float(high), _to_float(low))
+        return self._52w_range
+
+    def _find_52week_range(self):
+        """Find 52-week high and low in the API data"""
         # Try summary API first
         if self.summary_data:
             hw = self.summary_data.get('52wk_highlow', {})
@@ -311,227 +625,217 @@ class Section7Builder:
 
         return None, None
 
-    def _calculate_distance_from_52w(self, current_price, high, low):
-        """Calculate distance from 52-week high and low"""
-        try:
-            # Clean price strings
-            cmp = float(str(current_price).replace(',', ''))
-            high_val = float(str(high).replace(',', ''))
-            low_val = float(str(low).replace(',', ''))
-
-            # Distance from high (usually negative)
-            dist_from_high = ((cmp - high_val) / high_val) * 100
-
-            # Distance from low (usually positive)
-            dist_from_low = ((cmp - low_val) / low_val) * 100
-
-            # Format with sign
-            high_str = f"{dist_from_high:+.2f}%"
-            low_str = f"{dist_from_low:+.2f}%"
-
-            return high_str, low_str
-        except:
+    def _calculate_distance_from_52w(self, cmp, high, low):
+        """Calculate distance from 52-week high and low (all arguments are floats or None)"""
+        if cmp is None or not high or not low:
             return "N/A", "N/A"
 
+        # Distance from high (usually negative), distance from low (usually positive)
+        return f"{(cmp - high) / high * 100:+.2f}%", f"{(cmp - low) / low * 100:+.2f}%"
+
     def _get_valuation_grade_history(self):
         """Get valuation grade history from MongoDB"""
         if not self.use_mongodb or not self.mongo_handler:
             return None, None
 
         try:
-            # Get current grade
-            current_grade = self.mongo_handler.get_current_valuation_grade(int(self.stock_id))
-
-            # Get grade history
-            history = self.mongo_handler.get_valuation_grade_history(int(self.stock_id), limit=5)
-
-            return current_grade, history
+            # Get current grade and grade history in one MongoDB round-trip
+            return self.mongo_handler.get_valuation_snapshot(self._sid_int, limit=5)
         except Exception as e:
-            print(f"[WARNING] Error fetching valuation history: {e}")
+            logger.warning("Error fetching valuation history: %s", e)
             return None, None
 
     def build_section(self):
         """Build SECTION 7 from API data"""
         # Fetch all data first
         self.fetch_all_data()
+        return self._render_section()
+
+    async def build_section_async(self):
+        """
+        Build SECTION 7 from an event loop, overlapping the MongoDB grade lookup
+        with the four API fetches
+        """
+        _, grade_snapshot = await asyncio.gather(
+            self.fetch_all_data_async(),
+            asyncio.to_thread(self._get_valuation_grade_history),
+        )
+        return self._render_section(grade_snapshot)
+
+    def _has_data(self):
+        return bool(self.recommendation_data or self.summary_data
+                    or self.pricemovement_data or self.return_data)
+
+    def _has_core_data(self):
+        """True when the recommendation and summary fetches both succeeded"""
+        return bool(self.recommendation_data and self.summary_data)
+
+    def _render_section(self, grade_snapshot=None):
+        """Format SECTION 7 from the fetched data and remember it as the last good section"""
+        section_text = "\n".join(self.iter_section(grade_snapshot))
+        # A section built from only some of the APIs is not worth serving during an outage
+        if self._has_core_data():
+            self._store_last_good_section(section_text)
+        return section_text
+
+    def iter_section(self, grade_snapshot=None):
+        """
+        Yield the lines of SECTION 7 from already fetched data (see fetch_all_data).
+        grade_snapshot is (current_grade, grade_history); it is read from MongoDB when not given.
+        """
+        # Nothing to build from if every API failed; serve the last good section instead
+        if not self._has_data():
+            logger.warning("All Section 7 APIs failed for stock %s, using last good section if cached", self.stock_id)
+            yield self._load_last_good_section() or _SECTION7_UNAVAILABLE
+            return
 
         # Get current price and date
         current_price, current_date = self._get_current_price_and_date()
 
-        # Build output
-        lines = []
-        lines.append("=" * 80)
-        lines.append(f"SECTION 7: VALUATION METRICS (as of {current_date}, Price: Rs.{current_price})")
-        lines.append("=" * 80)
-        lines.append("")
-        lines.append("=" * 80)
-        lines.append("")
+        yield "=" * 80
+        yield f"SECTION 7: VALUATION METRICS (as of {current_date}, Price: Rs.{current_price})"
+        yield "=" * 80
+        yield ""
+        yield "=" * 80
+        yield ""
 
         # VALUATION MULTIPLES
-        lines.append("VALUATION MULTIPLES:")
-        lines.append("-" * 20)
-
-        # P/E Ratio
-        pe = self._extract_from_valuation_api("P/E Ratio")
-        lines.append(f"P/E Ratio (TTM):                      {pe}x" if pe else "P/E Ratio (TTM):                      N/A")
-
-        # Price to Book Value
-        pbv = self._extract_from_valuation_api("Price to Book Value")
-        if not pbv:
-            pbv = self._extract_from_valuation_api("Price to Book")
-        lines.append(f"Price to Book Value (P/BV):           {pbv}x" if pbv else "Price to Book Value (P/BV):           N/A")
-
-        # EV/EBITDA
-        ev_ebitda = self._extract_from_valuation_api("EV to EBITDA")
-        lines.append(f"EV/EBITDA:                            {ev_ebitda}x" if ev_ebitda else "EV/EBITDA:                            N/A")
+        yield "VALUATION MULTIPLES:"
+        yield "-" * 20
 
-        # EV/EBIT
-        ev_ebit = self._extract_from_valuation_api("EV to EBIT")
-        lines.append(f"EV/EBIT:                              {ev_ebit}x" if ev_ebit else "EV/EBIT:                              N/A")
+        # Each row shows the first name found in the valuation tables
+        for names, label, suffix in _VAL_ROWS:
+            value = None
+            for name in names:
+                value = self._extract_from_valuation_api(name)
+                if value:
+                    break
+            yield _row(label, value, suffix)
 
-        # EV/Sales
-        ev_sales = self._extract_from_valuation_api("EV to Sales")
-        lines.append(f"EV/Sales:                             {ev_sales}x" if ev_sales else "EV/Sales:                             N/A")
-
-        # EV/Capital Employed
-        ev_ce = self._extract_from_valuation_api("EV to Capital Employed")
-        lines.append(f"EV/Capital Employed:                  {ev_ce}x" if ev_ce else "EV/Capital Employed:                  N/A")
-
-        # PEG Ratio
-        peg = self._extract_from_valuation_api("PEG Ratio")
-        lines.append(f"PEG Ratio:                            {peg}x" if peg else "PEG Ratio:                            N/A")
-
-        lines.append("")
+        yield ""
 
         # DIVIDEND METRICS
-        lines.append("DIVIDEND METRICS:")
-        lines.append("-" * 17)
+        yield "DIVIDEND METRICS:"
+        yield "-" * 17
 
         # Dividend Yield
         div_yield = self._extract_from_valuation_api("Dividend Yield")
-        lines.append(f"Dividend Yield:                       {div_yield}" if div_yield else "Dividend Yield:                       N/A")
+        yield _row(_L_DIV_YIELD, div_yield)
 
         # Latest Dividend and Ex-Date - Multi-tier fallback approach
         # Method 1: Try returnAnalysis API first (most reliable - structured data)
         div_per_share, ex_date = self._parse_dividend_from_return_api()
 
         # Method 2: Fallback to tot_returns sentence (getSummary API)
-        if not div_per_share:
-            try:
-                tot_returns = self.summary_data.get('tot_returns', {})
-                sentence = tot_returns.get('sentence', '')
-                div_match = re.search(r'Latest dividend:\s*([\d.]+)', sentence)
-                date_match = re.search(r'ex-dividend date:\s*([\w]+-\d+-\d+)', sentence)
-                if div_match:
-                    div_per_share = f"Rs.{div_match.group(1)}"
-                    if date_match and not ex_date:
-                        ex_date = date_match.group(1)
-            except:
-                pass
+        sentence = (self.summary_data.get('tot_returns') or {}).get('sentence')
+        if not div_per_share and isinstance(sentence, str):
+            div_match = _DIV_LATEST_SENTENCE_RE.search(sentence)
+            if div_match:
+                div_per_share = f"Rs.{div_match.group(1)}"
+                date_match = _EX_DATE_RE.search(sentence)
+                if date_match and not ex_date:
+                    ex_date = date_match.group(1)
 
         # Method 3: Calculate from dividend yield and current price (fallback 2)
-        if not div_per_share:
-            try:
-                div_yield_val = self._extract_from_valuation_api("Dividend Yield")
-                main_header = self.summary_data.get('main_header', {})
-                cmp = main_header.get('cmp', '')
-
-                if div_yield_val and cmp:
-                    yield_val = float(div_yield_val.replace('%', ''))
-                    price_val = float(str(cmp).replace(',', ''))
-                    dividend = (yield_val * price_val) / 100
-                    div_per_share = f"Rs.{dividend:.2f}"
-                    print(f"[INFO] Calculated dividend from yield: {div_per_share}")
-            except:
-                pass
+        if not div_per_share and div_yield:
+            price_val = _to_float((self.summary_data.get('main_header') or {}).get('cmp', ''))
+            yield_val = _to_float(str(div_yield).replace('%', ''))
+
+            if price_val is not None and yield_val is not None:
+                dividend = (yield_val * price_val) / 100
+                div_per_share = f"Rs.{dividend:.2f}"
+                logger.info("Calculated dividend from yield: %s", div_per_share)
 
         # Method 4: Corporate actions with int() (last resort - fallback 3)
         if not div_per_share:
             div_per_share, ex_date = self._parse_dividend_info()
 
-        lines.append(f"Latest Dividend:                      {div_per_share} per share" if div_per_share else "Latest Dividend:                      N/A")
-        lines.append(f"Ex-Dividend Date:                     {ex_date}" if ex_date else "Ex-Dividend Date:                     N/A")
+        yield _row(_L_LATEST_DIV, div_per_share, " per share")
+        yield _row(_L_EX_DATE, ex_date)
 
         # Dividend Payout
         div_payout = self._get_dividend_payout()
-        lines.append(f"Dividend Payout:                      {div_payout}" if div_payout else "Dividend Payout:                      N/A")
+        yield _row(_L_DIV_PAYOUT, div_payout)
 
-        lines.append("")
+        yield ""
 
         # VALUATION ASSESSMENT
-        lines.append("VALUATION ASSESSMENT:")
-        lines.append("-" * 21)
+        yield "VALUATION ASSESSMENT:"
+        yield "-" * 21
 
         # Get valuation grade and history from MongoDB
-        current_grade, grade_history = self._get_valuation_grade_history()
+        if grade_snapshot is None:
+            grade_snapshot = self._get_valuation_grade_history()
+        current_grade, grade_history = grade_snapshot
 
         # Overall Valuation
-        if current_grade:
-            lines.append(f"Overall Valuation:                    {current_grade.upper()}")
-        else:
-            lines.append(f"Overall Valuation:                    Data Not Available")
+        yield _row(_L_OVERALL, current_grade and current_grade.upper(), missing="Data Not Available")
 
         # Valuation Grade History
         if grade_history and len(grade_history) > 0:
-            lines.append(f"Valuation Grade History:")
+            yield f"Valuation Grade History:"
             for change in grade_history:
                 from_grade = self.mongo_handler._format_valuation_grade(change['from_grade'])
                 to_grade = self.mongo_handler._format_valuation_grade(change['to_grade'])
                 date = change['formatted_date']
-                lines.append(f"- Changed to {to_grade} from {from_grade}: {date}")
+                yield f"- Changed to {to_grade} from {from_grade}: {date}"
         else:
-            lines.append(f"Valuation Grade History:              Data Not Available")
+            yield _row(_L_GRADE_HISTORY, None, missing="Data Not Available")
 
-        lines.append("")
+        yield ""
 
         # 52-WEEK RANGE
-        lines.append("52-WEEK RANGE:")
-        lines.append("-" * 14)
+        yield "52-WEEK RANGE:"
+        yield "-" * 14
 
         high_52w, low_52w = self._get_52week_range()
 
-        if high_52w:
-            lines.append(f"52-Week High:                         Rs.{high_52w}")
-        else:
-            lines.append(f"52-Week High:                         N/A")
-
-        if low_52w:
-            lines.append(f"52-Week Low:                          Rs.{low_52w}")
-        else:
-            lines.append(f"52-Week Low:                          N/A")
+        yield _row(_L_52W_HIGH, high_52w, prefix="Rs.")
+        yield _row(_L_52W_LOW, low_52w, prefix="Rs.")
 
         # Calculate distances
+        dist_high, dist_low = None, None
         if high_52w and low_52w and current_price != 'N/A':
-            dist_high, dist_low = self._calculate_distance_from_52w(current_price, high_52w, low_52w)
-            lines.append(f"Current Distance from High:           {dist_high}")
-            lines.append(f"Current Distance from Low:            {dist_low}")
+            dist_high, dist_low = self._calculate_distance_from_52w(self._cmp_float, *self._52w_floats)
+        yield _row(_L_DIST_HIGH, dist_high)
+        yield _row(_L_DIST_LOW, dist_low)
+
+        yield ""
+        yield ""
+
+    def save_to_file(self, output_file, section_text=None):
+        """
+        Save section to file. Without section_text the data is fetched and the
+        lines are streamed to disk as they are formatted; the written text is
+        returned and remembered as the last good section.
+        """
+        if section_text is not None:
+            with open(output_file, 'wb') as f:
+                f.write(section_text.encode('utf-8'))
         else:
-            lines.append(f"Current Distance from High:           N/A")
-            lines.append(f"Current Distance from Low:            N/A")
-
-        lines.append("")
-        lines.append("")
-
-        return "\n".join(lines)
-
-    def save_to_file(self, output_file):
-        """Build section and save to file"""
-        section_text = self.build_section()
-
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(section_text)
-
-        print(f"\n[OK] Section 7 saved to: {output_file}")
+            self.fetch_all_data()
+            lines = []
+            with open(output_file, 'wb') as f:
+                for i, line in enumerate(self.iter_section()):
+                    if i:
+                        f.write(_NL)
+                    f.write(line.encode('utf-8'))
+                    lines.append(line)
+            section_text = "\n".join(lines)
+            if self._has_core_data():
+                self._store_last_good_section(section_text)
+
+        logger.info("Section 7 saved to: %s", output_file)
         return section_text
 
     def cleanup(self):
-        """Clean up resources"""
-        if self.mongo_handler:
-            self.mongo_handler.close()
+        """Release this builder's MongoDB handle; the shared connection is closed at exit"""
+        self.mongo_handler = None
 
 
 def main():
     """Test the Section 7 builder"""
+    logging.basicConfig(level=logging.INFO)
     stock_id = 513374  # TCS
 
     print("=" * 80)
@@ -542,11 +846,11 @@ def main():
     builder = Section7Builder(stock_id)
     section_text = builder.build_section()
 
-    # Save to file
-    builder.save_to_file("section7_output.txt")
+    # Save to file (reuse the built text instead of re-fetching for each file)
+    builder.save_to_file("section7_output.txt", section_text=section_text)
 
     output_file = f"section7_stock_{stock_id}.txt"
-    builder.save_to_file(output_file)
+    builder.save_to_file(output_file, section_text=section_text)
 
     print("\n" + "=" * 80)
     print("SECTION 7 OUTPUT SAVED")
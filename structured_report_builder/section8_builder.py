@@ -2,11 +2,129 @@
 SECTION 8: SHAREHOLDING PATTERN Builder
 Dynamically builds shareholding pattern using API data
 """
-import requests
+import heapq
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
+from types import MappingProxyType
+from api_utils import create_session
+
+# Prefer orjson for faster response / cache decoding when available
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# On-disk cache of successful shareholding responses. Shareholding is filed quarterly,
+# so a day-old copy is still current while repeated builds skip the API entirely.
+_CACHE_DIR = Path(".cache") / "section8"
+_CACHE_TTL = 24 * 60 * 60
+
+# shareholding_graphs category titles ("Shareholding - Promoter holding") -> our standard names
+_CATEGORY_MAP = {
+    'Promoter holding': 'Promoter',
+    'FII Holdings': 'FII',
+    'MF Holdings': 'MF',
+    'Insurance Holdings': 'Insurance',
+    'Other DII Holdings': 'Other DII',
+    'NIIs Holdings': 'Non-Institutional'
+}
+
+def _format_quarter(label):
+    """Shorten a quarter label like "Jun 2025" to "Jun'25"; other shapes are kept as-is"""
+    parts = label.split()
+    if len(parts) == 2:
+        return f"{parts[0][:3]}'{parts[1][2:]}"
+    return label
+
+
+# Institutional activity reported when a count is not found
+_DEFAULT_ACTIVITY = MappingProxyType({
+    'fii_count': 'N/A',
+    'mf_count': 'N/A',
+    'insurance_count': 'N/A'
+})
+
+# Shared read-only default for quarters missing from a category
+_EMPTY = {}
+
+# Output layout: row labels are padded to 24 characters, quarter columns to 8
+_NL = b"\n"
+_RULE = "=" * 80
+_TABLE_RULE = "-" * 62
+_QUARTER_LABEL = "Quarter:".ljust(24)
+_CHANGE_LABEL = "Change (Sequential):".ljust(24)
+_CATEGORY_LABELS = tuple((cat_name, label.ljust(24)) for cat_name, label in (
+    ('Promoter', 'Promoter Holding:'),
+    ('FII', 'FII Holding:'),
+    ('MF', 'Mutual Fund Holding:'),
+    ('Insurance', 'Insurance Holdings:'),
+    ('Other DII', 'Other DII Holdings:'),
+    ('Non-Institutional', 'Non-Institutional:')
+))
+
+# Institutional holder counts in the rhs items: prefix token -> (word after the count, activity key).
+# Tokens are checked in insertion order and the first one found in the prefix wins.
+# A word of None takes the first number.
+# Suffixes look like "Held by 1547 FIIs (11.47%)" or "Held by 40 Schemes (5.13%)".
+_RHS_DISPATCH = {
+    'FII': ('FII', 'fii_count'),
+    'Mutual Fund': ('Scheme', 'mf_count'),
+    'Insurance': (None, 'insurance_count'),
+}
+
+
+def _int_before(text, needle):
+    """Return the number written before needle ("1547 FIIs" -> "1547"), or None; same as r'(\d+)\s+needle'"""
+    i = text.find(needle)
+    while i != -1:
+        # Step back over the whitespace, then over the digits before it
+        j = i
+        while j > 0 and text[j - 1].isspace():
+            j -= 1
+        k = j
+        while k > 0 and text[k - 1].isdecimal():
+            k -= 1
+        if k < j < i:
+            return text[k:j]
+        i = text.find(needle, i + 1)
+    return None
+
+
+def _first_int(text):
+    """Return the first run of digits in text, or None"""
+    for i, ch in enumerate(text):
+        if ch.isdecimal():
+            j = i + 1
+            while j < len(text) and text[j].isdecimal():
+                j += 1
+            return text[i:j]
+    return None
+
+
+def _parse_pct(text):
+    """Parse a percentage string like "45.3%" to a float, or None when it is not a number"""
+    if '%' in text:
+        text = text.replace('%', '')
+    # Plain decimals ("45.3", "-1.5") are checked without raising
+    digits = text[1:] if text[:1] == '-' else text
+    if digits.replace('.', '', 1).isdecimal():
+        return float(text)
+    # Anything else (whitespace, exponents, "inf", ...) gets float()'s own rules
+    try:
+        return float(text)
+    except ValueError:
+        return None
 
 class Section8Builder:
+    # Shared across builders so batch runs reuse pooled keep-alive connections to the API host;
+    # transient 429/5xx responses are retried by the adapter
+    _session = create_session(pool_connections=4, pool_maxsize=32, retries=3,
+                              status_forcelist=(429, 500, 502, 503, 504))
+
     def __init__(self, stock_id, exchange=0):
         self.stock_id = str(stock_id)
         self.exchange = exchange
@@ -14,8 +132,45 @@ class Section8Builder:
 
         self.shareholding_data = {}
 
-    def fetch_shareholding_data(self):
-        """Fetch shareholding data"""
+        # Built section text, kept so repeated builds/saves don't re-extract; reset on fetch
+        self._built = None
+
+    def _cache_file(self):
+        return _CACHE_DIR / f"shareholding-{self.stock_id}-{self.exchange}.json"
+
+    def _read_cache(self):
+        """Return cached shareholding data if it is younger than _CACHE_TTL, else None"""
+        try:
+            with open(self._cache_file(), 'rb') as f:
+                cached = _json_loads(f.read())
+        except (OSError, ValueError):
+            return None
+
+        # Anything but our own {'fetched_at', 'data'} record is a cache miss
+        fetched_at = cached.get('fetched_at') if isinstance(cached, dict) else None
+        if not isinstance(fetched_at, (int, float)) or time.time() - fetched_at >= _CACHE_TTL:
+            return None
+        return cached.get('data')
+
+    def _write_cache(self, data):
+        cache_file = self._cache_file()
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(cache_file, 'w', encoding='utf-8') as f:
+                json.dump({'fetched_at': time.time(), 'data': data}, f)
+        except OSError as e:
+            print(f"[WARNING] Could not write cache {cache_file}: {e}")
+
+    def fetch_shareholding_data(self, force_refresh=False):
+        """Fetch shareholding data, served from the on-disk cache unless force_refresh is set"""
+        if not force_refresh:
+            cached = self._read_cache()
+            if cached:
+                self.shareholding_data = cached
+                self._built = None
+                print(f"[OK] Shareholding data loaded from cache")
+                return True
+
         print(f"Fetching shareholding data...")
 
         try:
@@ -24,14 +179,16 @@ class Section8Builder:
                 "exchange": self.exchange
             }
 
-            response = requests.post(self.shareholding_api_url, json=payload, timeout=30)
+            response = self._session.post(self.shareholding_api_url, json=payload, timeout=30)
             response.raise_for_status()
-            result = response.json()
+            result = _json_loads(response.content)
 
             # Handle both string and int codes
             code = str(result.get('code'))
             if code == '200' and 'data' in result:
                 self.shareholding_data = result['data']
+                self._built = None
+                self._write_cache(self.shareholding_data)
                 print(f"[OK] Shareholding API successful")
                 return True
             else:
@@ -41,176 +198,130 @@ class Section8Builder:
 
         return False
 
-    def _extract_quarterly_holdings(self):
-        """Extract quarterly holdings for all categories from shareholding_graphs.data"""
+    def _extract_quarterly_holdings(self, graphs_data):
+        """
+        Extract quarterly holdings for all categories from the (non-empty) shareholding_graphs.data.
+        Returns (categories, quarter header labels like "Jun'25"), or None on failure.
+        """
         try:
-            graphs_data = self.shareholding_data.get('shareholding_graphs', {}).get('data', [])
-
-            if not graphs_data or len(graphs_data) == 0:
-                return None
-
             # shareholding_graphs.data is an array of 6 categories
             # Each category has: title, data (dict with quarter keys like "202506")
 
-            # Map category titles to our standard names
-            category_mapping = {
-                'Promoter holding': 'Promoter',
-                'FII Holdings': 'FII',
-                'MF Holdings': 'MF',
-                'Insurance Holdings': 'Insurance',
-                'Other DII Holdings': 'Other DII',
-                'NIIs Holdings': 'Non-Institutional'
-            }
-
-            # Initialize structure for 6 categories
+            # Initialize structure for 6 categories: parallel lists of quarter labels,
+            # formatted values and values at display precision (for the change row)
             categories = {
-                'Promoter': [],
-                'FII': [],
-                'MF': [],
-                'Insurance': [],
-                'Other DII': [],
-                'Non-Institutional': []
+                cat_name: {'quarters': [], 'values': [], 'raw': []}
+                for cat_name in _CATEGORY_MAP.values()
             }
 
             # Extract quarters from first category to get chronological order
-            if graphs_data and len(graphs_data) > 0:
-                first_cat_data = graphs_data[0].get('data', {})
-                # Get quarter keys sorted in reverse (most recent first)
-                all_quarters = sorted(first_cat_data.keys(), reverse=True)
-                # Take only first 5 quarters
-                quarters_to_use = all_quarters[:5]
-            else:
-                return None
+            first_cat_data = graphs_data[0].get('data', {})
+            # Take the 5 most recent quarter keys, newest first ("YYYYMM" strings sort
+            # chronologically) without sorting the full history
+            quarters_to_use = heapq.nlargest(5, first_cat_data.keys())
 
             # For each category in the API
             for cat_obj in graphs_data:
                 title = cat_obj.get('title', '')
 
-                # Extract category name from title like "Shareholding - Promoter holding"
-                cat_name = None
-                for key_phrase, std_name in category_mapping.items():
-                    if key_phrase in title:
-                        cat_name = std_name
-                        break
+                # Extract category name from title like "Shareholding - Promoter holding";
+                # titles in any other shape fall back to a substring match
+                cat_name = _CATEGORY_MAP.get(title.split(' - ', 1)[-1])
+                if cat_name is None:
+                    cat_name = next((std_name for key_phrase, std_name in _CATEGORY_MAP.items()
+                                     if key_phrase in title), None)
 
                 if not cat_name:
                     continue
 
-                # Get quarterly data for this category
-                quarter_data_dict = cat_obj.get('data', {})
+                # Get quarterly data for this category (bound once for the quarter loop)
+                quarter_data_get = cat_obj.get('data', _EMPTY).get
+                category = categories[cat_name]
+                quarters_append = category['quarters'].append
+                values_append = category['values'].append
+                raw_append = category['raw'].append
 
                 # Extract values for each quarter
                 for q_key in quarters_to_use:
-                    q_info = quarter_data_dict.get(q_key, {})
-                    quarter_label = q_info.get('date', 'N/A')  # Like "Jun 2025"
+                    q_info = quarter_data_get(q_key, _EMPTY)
                     value = q_info.get('value', 0)
 
-                    # Format value as percentage
-                    formatted_value = f"{value:.2f}%"
+                    # Format value as percentage; keep the number at display precision
+                    # so sequential changes match the shown values
+                    values_append(f"{value:.2f}%")
+                    raw_append(round(value, 2))
+                    quarters_append(q_info.get('date', 'N/A'))  # Like "Jun 2025"
 
-                    categories[cat_name].append({
-                        'quarter': quarter_label,
-                        'value': formatted_value
-                    })
+            # Header labels come from the Promoter category, formatted once here
+            quarter_display = [_format_quarter(q) for q in categories['Promoter']['quarters']]
 
-            return categories
+            return categories, quarter_display
         except Exception as e:
             print(f"[WARNING] Error extracting quarterly holdings: {e}")
             return None
 
-    def _calculate_qoq_change(self, current, previous):
-        """Calculate QoQ change between two values"""
-        try:
-            if current == 'N/A' or previous == 'N/A':
-                return 'N/A'
-
-            curr_val = float(str(current).replace('%', '').strip())
-            prev_val = float(str(previous).replace('%', '').strip())
-
-            change = curr_val - prev_val
-
+    def _sequential_changes(self, raw):
+        """Format the change of each quarter from the next (older) one; the oldest quarter gets N/A"""
+        changes = []
+        for current, previous in zip(raw, raw[1:]):
+            change = current - previous
             if change > 0:
-                return f"+{change:.2f}"
+                changes.append(f"+{change:.2f}%")
             elif change < 0:
-                return f"{change:.2f}"
+                changes.append(f"{change:.2f}%")
             else:
-                return "0.00"
-        except:
-            return 'N/A'
+                changes.append("0.00%")
+        changes.append('N/A')
+        return changes
 
-    def _extract_promoter_details(self):
+    def _extract_promoter_details(self, sh):
         """Extract individual promoter holdings (only those with holdings > 0%)"""
         try:
-            promoter_data = self.shareholding_data.get('promoter_holding', {}).get('data', [])
+            promoter_data = sh.get('promoter_holding', {}).get('data') or []
 
             promoters = []
-            for i, p in enumerate(promoter_data):
-                # Skip header row (first row)
-                if i == 0:
-                    continue
-
-                name = p.get('shp_name', '')
+            append = promoters.append
+            # Skip header row (first row)
+            for p in promoter_data[1:]:
                 holding = p.get('shp_perc', '0')
+                text = holding if isinstance(holding, str) else str(holding)
 
                 # Filter only those with holdings > 0%
-                try:
-                    holding_val = float(str(holding).replace('%', '').strip())
-                    if holding_val > 0:
-                        promoters.append({'name': name, 'holding': holding})
-                except:
-                    continue
+                holding_val = _parse_pct(text)
+                if holding_val is not None and holding_val > 0:
+                    append({'name': p.get('shp_name', ''), 'holding': holding})
 
             return promoters
-        except:
+        except (AttributeError, TypeError, ValueError):
             return []
 
-    def _extract_institutional_activity(self):
+    def _extract_institutional_activity(self, sh):
         """Extract institutional activity from rhs array"""
         try:
-            import re
-            rhs_data = self.shareholding_data.get('shareholding', {}).get('rhs', [])
+            rhs_data = sh.get('shareholding', {}).get('rhs', [])
 
-            activity = {
-                'fii_count': 'N/A',
-                'mf_count': 'N/A',
-                'insurance_count': 'N/A'
-            }
+            activity = dict(_DEFAULT_ACTIVITY)
 
             for item in rhs_data:
                 prefix = item.get('prefix', '')
-                suffix = item.get('suffix', '')
 
-                # Extract FII count from "Held by 1547 FIIs (11.47%)"
-                if 'FII' in prefix:
-                    match = re.search(r'(\d+)\s+FII', suffix)
-                    if match:
-                        activity['fii_count'] = match.group(1)
-
-                # Extract MF count from "Held by 40 Schemes (5.13%)"
-                elif 'Mutual Fund' in prefix:
-                    match = re.search(r'(\d+)\s+Scheme', suffix)
-                    if match:
-                        activity['mf_count'] = match.group(1)
-
-                # Insurance - check if there's similar pattern
-                elif 'Insurance' in prefix:
-                    match = re.search(r'(\d+)', suffix)
-                    if match:
-                        activity['insurance_count'] = match.group(1)
+                for token, (needle, key) in _RHS_DISPATCH.items():
+                    if token in prefix:
+                        suffix = item.get('suffix', '')
+                        count = _first_int(suffix) if needle is None else _int_before(suffix, needle)
+                        if count:
+                            activity[key] = count
+                        break
 
             return activity
-        except:
-            return {
-                'fii_count': 'N/A',
-                'mf_count': 'N/A',
-                'insurance_count': 'N/A'
-            }
+        except (AttributeError, TypeError, ValueError):
+            return dict(_DEFAULT_ACTIVITY)
 
-    def _extract_pledging_info(self):
+    def _extract_pledging_info(self, sh):
         """Extract pledging information"""
         try:
             # Check RHS first for pledging status
-            rhs_data = self.shareholding_data.get('shareholding', {}).get('rhs', [])
+            rhs_data = sh.get('shareholding', {}).get('rhs', [])
 
             for item in rhs_data:
                 prefix = item.get('prefix', '')
@@ -223,7 +334,7 @@ class Section8Builder:
                         return suffix
 
             # Fallback: check pledged_shares.details
-            pledged_data = self.shareholding_data.get('pledged_shares', {}).get('details', {})
+            pledged_data = sh.get('pledged_shares', {}).get('details', {})
 
             if pledged_data:
                 alert = pledged_data.get('data', {}).get('alert', '')
@@ -231,142 +342,147 @@ class Section8Builder:
                     return "No pledging"
 
             return "No pledging"
-        except:
+        except (AttributeError, TypeError, ValueError):
             return "Data Not Available"
 
-    def build_section(self):
-        """Build SECTION 8 from API data"""
+    def _load_holdings(self):
+        """Fetch (if not already loaded) and extract the quarterly holdings; returns (holdings, error)"""
         # Fetch all data first (if not already loaded)
         if not self.shareholding_data:
             if not self.fetch_shareholding_data():
-                return "ERROR: Failed to fetch shareholding data"
+                return None, "ERROR: Failed to fetch shareholding data"
+
+        # Partial responses without graph data cannot produce the table; stop before
+        # walking the nested payload
+        sh = self.shareholding_data
+        graphs = sh.get('shareholding_graphs') if isinstance(sh, dict) else None
+        graphs_data = graphs.get('data') if isinstance(graphs, dict) else None
+        if not graphs_data:
+            return None, "ERROR: Failed to extract quarterly holdings"
 
         # Extract quarterly holdings
-        categories = self._extract_quarterly_holdings()
-
-        if not categories:
-            return "ERROR: Failed to extract quarterly holdings"
-
-        # Build output
-        lines = []
-        lines.append("=" * 80)
-        lines.append("SECTION 8: SHAREHOLDING PATTERN (Last 5 Quarters)")
-        lines.append("=" * 80)
-        lines.append("")
-
-        # Get quarter labels from the first category
-        quarters = []
-        if categories.get('Promoter') and len(categories['Promoter']) > 0:
-            quarters = [q['quarter'] for q in categories['Promoter']]
-
-        # Format quarters as "Jun'25" instead of "Jun 2025"
-        quarters_formatted = []
-        for q in quarters:
-            q_parts = q.split()
-            if len(q_parts) == 2:
-                month = q_parts[0][:3]  # First 3 letters
-                year = q_parts[1][2:]   # Last 2 digits
-                quarters_formatted.append(f"{month}'{year}")
-            else:
-                quarters_formatted.append(q)
+        holdings = self._extract_quarterly_holdings(graphs_data)
+
+        if not holdings:
+            return None, "ERROR: Failed to extract quarterly holdings"
+        return holdings, None
+
+    def build_section(self):
+        """Build SECTION 8 from API data (the result is reused until the data is fetched again)"""
+        if self._built is None:
+            holdings, error = self._load_holdings()
+            if error:
+                return error
+            self._built = "\n".join(self._iter_section(holdings))
+        return self._built
+
+    def _iter_section(self, holdings):
+        """Yield the lines of SECTION 8 for the extracted (categories, quarter labels)"""
+        categories, quarters_formatted = holdings
+        sh = self.shareholding_data
+
+        yield _RULE
+        yield "SECTION 8: SHAREHOLDING PATTERN (Last 5 Quarters)"
+        yield _RULE
+        yield ""
 
         # Header row
-        lines.append("")
-        header = "Quarter:                "
-        for q in quarters_formatted:
-            header += f"{q:<8}"
-        lines.append(header)
+        yield ""
+        yield _QUARTER_LABEL + "".join(f"{q:<8}" for q in quarters_formatted)
 
         # Separator
-        lines.append("-" * 62)
+        yield _TABLE_RULE
 
         # For each category, print holdings and QoQ changes
-        category_labels = {
-            'Promoter': 'Promoter Holding:',
-            'FII': 'FII Holding:',
-            'MF': 'Mutual Fund Holding:',
-            'Insurance': 'Insurance Holdings:',
-            'Other DII': 'Other DII Holdings:',
-            'Non-Institutional': 'Non-Institutional:'
-        }
-
-        for cat_name, cat_label in category_labels.items():
-            cat_data = categories.get(cat_name, [])
-
-            if len(cat_data) == 0:
+        for cat_name, cat_label in _CATEGORY_LABELS:
+            category = categories[cat_name]
+
+            if not category['values']:
                 continue
 
             # Holdings row
-            row = f"{cat_label:<24}"
-            for q in cat_data:
-                val = q.get('value', 'N/A')
-                row += f"{val:<8}"
-            lines.append(row)
+            yield cat_label + "".join(f"{value:<8}" for value in category['values'])
 
             # QoQ change row
-            change_row = f"{'Change (Sequential):':<24}"
-            for i, q in enumerate(cat_data):
-                if i == len(cat_data) - 1:
-                    # Oldest quarter - no previous data
-                    change_row += f"{'N/A':<8}"
-                else:
-                    # Calculate change from next quarter (older)
-                    current = q.get('value', 'N/A')
-                    previous = cat_data[i + 1].get('value', 'N/A')
-                    change = self._calculate_qoq_change(current, previous)
-                    # Add % sign if not N/A
-                    if change != 'N/A':
-                        change = f"{change}%"
-                    change_row += f"{change:<8}"
-
-            lines.append(change_row)
-            lines.append("")
+            yield _CHANGE_LABEL + "".join(f"{change:<8}" for change in self._sequential_changes(category['raw']))
+            yield ""
 
         # PROMOTER DETAILS
-        lines.append("KEY PROMOTER DETAILS:")
-        lines.append("-" * 21)
+        yield "KEY PROMOTER DETAILS:"
+        yield "-" * 21
 
-        promoters = self._extract_promoter_details()
+        promoters = self._extract_promoter_details(sh)
         if promoters and len(promoters) > 0:
             for p in promoters:
                 name = p['name']
                 holding = p['holding']
                 # Left-aligned format like reference
-                lines.append(f"{name:<45} {holding}")
+                yield f"{name:<45} {holding}"
         else:
-            lines.append("  Data Not Available")
+            yield "  Data Not Available"
 
-        lines.append("")
+        yield ""
 
         # INSTITUTIONAL ACTIVITY
-        lines.append("INSTITUTIONAL ACTIVITY:")
-        lines.append("-" * 23)
+        yield "INSTITUTIONAL ACTIVITY:"
+        yield "-" * 23
 
-        activity = self._extract_institutional_activity()
-        lines.append(f"Number of FIIs:                      {activity['fii_count']}")
-        lines.append(f"Number of MFs:                       {activity['mf_count']}")
-        lines.append(f"Number of Insurance Companies:       {activity['insurance_count']}")
+        activity = self._extract_institutional_activity(sh)
+        yield f"Number of FIIs:                      {activity['fii_count']}"
+        yield f"Number of MFs:                       {activity['mf_count']}"
+        yield f"Number of Insurance Companies:       {activity['insurance_count']}"
 
-        lines.append("")
+        yield ""
 
         # PLEDGING INFORMATION
-        lines.append("PROMOTER PLEDGING:")
-        lines.append("-" * 18)
-
-        pledging = self._extract_pledging_info()
-        lines.append(f"Pledged Shares:                      {pledging}")
-
-        lines.append("")
-        lines.append("")
-
-        return "\n".join(lines)
-
-    def save_to_file(self, output_file):
-        """Build section and save to file"""
-        section_text = self.build_section()
-
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(section_text)
+        yield "PROMOTER PLEDGING:"
+        yield "-" * 18
+
+        pledging = self._extract_pledging_info(sh)
+        yield f"Pledged Shares:                      {pledging}"
+
+        yield ""
+        yield ""
+
+    @classmethod
+    def build_many(cls, stock_ids, exchange=0, max_workers=16):
+        """
+        Build SECTION 8 for many stocks concurrently; the builders share the pooled session.
+        Returns dictionary of stock_id -> section text.
+        """
+        builders = [cls(stock_id, exchange) for stock_id in stock_ids]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            sections = list(executor.map(lambda builder: builder.build_section(), builders))
+
+        return {builder.stock_id: section for builder, section in zip(builders, sections)}
+
+    def save_to_file(self, output_file, section_text=None):
+        """
+        Save section to file. Without section_text (and no section built yet)
+        the lines are streamed to disk as they are formatted; the written text
+        is returned and kept for reuse like build_section does.
+        """
+        if section_text is None:
+            section_text = self._built
+
+        if section_text is not None:
+            with open(output_file, 'wb') as f:
+                f.write(section_text.encode('utf-8'))
+        else:
+            holdings, error = self._load_holdings()
+            with open(output_file, 'wb') as f:
+                if error:
+                    f.write(error.encode('utf-8'))
+                    section_text = error
+                else:
+                    lines = []
+                    for i, line in enumerate(self._iter_section(holdings)):
+                        if i:
+                            f.write(_NL)
+                        f.write(line.encode('utf-8'))
+                        lines.append(line)
+                    section_text = self._built = "\n".join(lines)
 
         print(f"\n[OK] Section 8 saved to: {output_file}")
         return section_text
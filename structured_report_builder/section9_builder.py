@@ -2,12 +2,271 @@
 SECTION 9: STOCK PRICE & RETURNS ANALYSIS Builder
 Dynamically builds stock price and returns analysis using API data
 """
-import requests
+import asyncio
+import atexit
 import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
+from pathlib import Path
+from types import MappingProxyType
+from api_utils import create_session
+
+# Prefer orjson for faster response / cache decoding when available. Responses are decoded
+# from the raw UTF-8 bytes (response.content), which skips the charset detection and
+# bytes -> str copy that response.json() goes through via response.text
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# Try importing pysimdjson: the return analysis payload is large, but only a few of its
+# cards are read, so the rest need never be turned into Python objects
+try:
+    import simdjson
+    SIMDJSON_AVAILABLE = True
+except ImportError:
+    SIMDJSON_AVAILABLE = False
+
+# Cards of return_data used by the extractors
+_RETURN_CARDS = ('stock_vs_sensex_card', 'return_summary_card', 'risk_card')
+
+# simdjson parsers are reusable but not thread-safe, so keep one per thread
+_simdjson_local = threading.local()
+
+def _materialize(node):
+    """Convert a simdjson node to plain Python objects"""
+    if isinstance(node, simdjson.Object):
+        return node.as_dict()
+    if isinstance(node, simdjson.Array):
+        return node.as_list()
+    return node
+
+def _decode_return_response(content):
+    """
+    Decode the return analysis API response. With pysimdjson only the _RETURN_CARDS
+    of its data are materialized; otherwise the whole payload is decoded.
+    """
+    if not SIMDJSON_AVAILABLE:
+        return _json_loads(content)
+
+    parser = getattr(_simdjson_local, 'parser', None)
+    if parser is None:
+        parser = _simdjson_local.parser = simdjson.Parser()
+
+    doc = parser.parse(content)
+    result = {'code': doc.get('code')}
+    if 'data' in doc:
+        data = doc['data']
+        if isinstance(data, simdjson.Object):
+            result['data'] = {card: _materialize(data[card]) for card in _RETURN_CARDS if card in data}
+        else:
+            result['data'] = _materialize(data)
+    return result
+
+# Try importing httpx with HTTP/2 support so the async path can multiplex the three
+# API calls over one connection
+try:
+    import httpx
+    import h2  # noqa: F401 - required by httpx for http2=True
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+def _async_client(max_keepalive_connections=4):
+    """HTTP/2 httpx client for the async build path (requires httpx + h2)"""
+    return httpx.AsyncClient(http2=True, timeout=30.0,
+                             limits=httpx.Limits(max_keepalive_connections=max_keepalive_connections))
+
+# Beta value in a message like "TCS has a beta(adjusted beta) of 1.00 with SENSEX"
+_BETA_VALUE_RE = re.compile(r'of\s+([\d.]+)')
+
+# TODAY_PRICE_STATS field name (or a part of it) -> price_info key, in match priority order
+_PRICE_FIELD_MAP = {
+    'Prev. Close': 'prev_close',
+    'Open Price': 'open',
+    'Volume traded': 'volume',
+    'Weighted Avg Price': 'weighted_avg',
+}
+
+# Output blocks; each ends with a newline so joining the section lines leaves a blank line after it
+_HEADER = "\n".join((
+    "=" * 80,
+    "SECTION 9: STOCK PRICE & RETURNS ANALYSIS",
+    "=" * 80,
+    "",
+    "",
+))
+
+_PRICE_TEMPLATE = "\n".join((
+    "CURRENT PRICE DATA ({date}):",
+    "-" * 33,
+    "Last Traded Price:                    ₹{last_traded_price},",
+    "Previous Close:                       ₹{prev_close}",
+    "Open:                                 ₹{open}",
+    "Day's High:                           ₹{day_high}",
+    "Day's Low:                            ₹{day_low}",
+    "Volume Traded:                        {volume} shares",
+    "Weighted Avg Price:                   ₹{weighted_avg}",
+    "",
+))
+
+_RETURNS_HEADER = "\n".join((
+    "PRICE RETURNS:",
+    "-" * 14,
+    f"{'Period':<16}{'Stock Return':<16}{'Sensex Return':<16}Alpha",
+    "-" * 54,
+))
+
+_RISK_TEMPLATE = "\n".join((
+    "RISK-ADJUSTED RETURNS (1 Year):",
+    "-" * 32,
+    "Stock Absolute Return:                {stock_absolute}",
+    "Risk-Adjusted Return:                 {stock_risk_adjusted}",
+    "Volatility:                           {stock_volatility}",
+    "Sharpe Ratio:                         {sharpe}",
+    "Risk Category:                        {risk_category}",
+    "",
+    "Sensex Absolute Return:               {sensex_absolute}",
+    "Sensex Risk-Adjusted Return:          {sensex_risk_adjusted}",
+    "Sensex Volatility:                    {sensex_volatility}",
+    "",
+))
+
+_BETA_TEMPLATE = "\n".join((
+    "BETA & RISK:",
+    "-" * 12,
+    "Beta (Adjusted):                      {beta} ({beta_category})",
+    "Classification:                       {classification}",
+    "Interpretation:                       {interpretation}",
+    "",
+))
+
+# Moving-average periods with their labels padded to the value column
+_MA_ROWS = tuple((field, f"{field} MA:".ljust(38))
+                 for field in ('5 Days', '20 Days', '50 Days', '100 Days', '200 Days'))
+
+class _Fields(dict):
+    """Template context that shows N/A for any field the extracted data lacks"""
+    def __missing__(self, key):
+        return 'N/A'
+
+_EMPTY = {}
+
+def _deep_get(data, *keys, default=None, kind=None):
+    """
+    Follow keys (dict keys or list indexes) into nested API data. Returns default when a step
+    is missing or None, or when kind is given and the value found is not an instance of it.
+    """
+    for key in keys:
+        if isinstance(data, dict):
+            data = data.get(key)
+        elif isinstance(data, list) and isinstance(key, int) and 0 <= key < len(data):
+            data = data[key]
+        else:
+            return default
+    if data is None or (kind is not None and not isinstance(data, kind)):
+        return default
+    return data
+
+# stock_vs_sensex_card period keys with their display names, in table order
+_PERIOD_ORDER = (
+    ('1D', '1 day'),
+    ('1W', '1 week'),
+    ('1M', '1 month'),
+    ('3M', '3 month'),
+    ('6M', '6 month'),
+    ('YTD', 'YTD'),
+    ('1Y', '1 year'),
+    ('2Y', '2 years'),
+    ('3Y', '3 years'),
+    ('4Y', '4 year'),
+    ('5Y', '5 years'),
+    ('10Y', '10 year'),
+)
+
+def _build_returns_row(display, period_data):
+    """Build one PRICE RETURNS row from a stock_vs_sensex_card period entry"""
+    stock_val = _deep_get(period_data, 'STOCK', 'value', default='N/A')
+    stock_dir = _deep_get(period_data, 'STOCK', 'dir', default=0)
+    sensex_val = _deep_get(period_data, 'SENSEX', 'value', default='N/A')
+    sensex_dir = _deep_get(period_data, 'SENSEX', 'dir', default=0)
+
+    # Treat "0.00" with dir=0 as missing data (not truly 0% return)
+    if stock_val == "0.00" and stock_dir == 0:
+        stock_val = 'N/A'
+    if sensex_val == "0.00" and sensex_dir == 0:
+        sensex_val = 'N/A'
+
+    # Calculate alpha - ONLY if both stock and sensex have valid data
+    alpha = 'N/A'
+    if stock_val != 'N/A' and sensex_val != 'N/A':
+        try:
+            alpha_num = float(stock_val) - float(sensex_val)
+            alpha = f"{alpha_num:+.2f}%"  # With sign
+        except (ValueError, TypeError):
+            alpha = 'N/A'
+
+    # Format percentages
+    return {
+        'period': display,
+        'stock_return': f"{stock_val}%" if stock_val != 'N/A' else 'N/A',
+        'sensex_return': f"{sensex_val}%" if sensex_val != 'N/A' else 'N/A',
+        'alpha': alpha
+    }
+
+# Extraction results for a return_data card that is missing, used without running the extractor
+_NO_RETURNS = tuple(_build_returns_row(display, _EMPTY) for _, display in _PERIOD_ORDER)
+_NO_SECTOR_COMPARISON = MappingProxyType({
+    'stock_return': 'N/A%',
+    'sector_return': 'N/A%',
+    'performance': 'N/A'
+})
+_NO_BETA = MappingProxyType({
+    'beta': 'N/A',
+    'classification': 'N/A',
+    'interpretation': 'N/A'
+})
+
+def _pick_exch(items, prefer='BSE'):
+    """Return the entry of items for the preferred exchange (any case), else the first one, else None"""
+    if not isinstance(items, list):
+        return None
+    for item in items:
+        exch = _deep_get(item, 'exch', kind=str, default='')
+        # Exact match first so the usual upper-case code needs no .upper() copy
+        if exch == prefer or exch.upper() == prefer:
+            return item
+    first = items[0] if items else None
+    return first if isinstance(first, dict) else None
+
+# On-disk cache of API responses (price moves intraday, returns and summary daily)
+_CACHE_DIR = Path(".cache") / "section9"
+_CACHE_TTLS = {
+    'price': 5 * 60,
+    'return': 24 * 60 * 60,
+    'summary': 24 * 60 * 60,
+}
 
 class Section9Builder:
-    def __init__(self, stock_id, exchange=0):
+    # Fixed attribute set without a per-instance __dict__, since batch runs create one
+    # builder per stock (the session and executor below are class attributes)
+    __slots__ = (
+        'stock_id', 'exchange', 'include_names',
+        'price_api_url', 'return_api_url', 'summary_api_url',
+        'price_data', 'return_data', 'summary_data',
+        '_built_text',
+    )
+
+    # Shared across builders so the three APIs (same host) reuse pooled keep-alive connections
+    _session = create_session(pool_connections=4, pool_maxsize=8, retries=2, backoff_factor=0.2)
+    # Shared so back-to-back builds (e.g. a portfolio of reports) reuse worker threads
+    _executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='sec9')
+
+    def __init__(self, stock_id, exchange=0, include_names=True):
         self.stock_id = str(stock_id)
         self.exchange = exchange
         self.price_api_url = "https://frapi.marketsmojo.com/apiv1/price/priceupdates"
@@ -18,8 +277,54 @@ class Section9Builder:
         self.return_data = {}
         self.summary_data = {}
 
-    def fetch_price_data(self):
-        """Fetch price movement data"""
+        # Batch callers that only aggregate the numbers can set include_names=False to skip
+        # the summary API; the SECTOR COMPARISON labels then use "Stock" / "Industry"
+        self.include_names = include_names
+
+        # Built section text, kept so repeated builds/saves don't re-extract; reset on fetch
+        self._built_text = None
+
+    def _cache_file(self, endpoint):
+        return _CACHE_DIR / endpoint / f"{self.stock_id}_{self.exchange}.json"
+
+    def _read_cache(self, endpoint):
+        """Return cached data for endpoint if it is younger than its TTL, else None"""
+        try:
+            with open(self._cache_file(endpoint), 'rb') as f:
+                cached = _json_loads(f.read())
+        except (OSError, ValueError):
+            return None
+
+        # Anything but our own {'ts', 'data'} record is a cache miss
+        ts = cached.get('ts') if isinstance(cached, dict) else None
+        if not isinstance(ts, (int, float)) or time.time() - ts >= _CACHE_TTLS[endpoint]:
+            return None
+        return cached.get('data')
+
+    def _write_cache(self, endpoint, data):
+        cache_file = self._cache_file(endpoint)
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(cache_file, 'w', encoding='utf-8') as f:
+                json.dump({'ts': time.time(), 'data': data}, f)
+        except OSError as e:
+            print(f"[WARNING] Could not write cache {cache_file}: {e}")
+
+    def _load_cached(self, endpoint, label):
+        """Load self.<endpoint>_data from the on-disk cache; returns whether it was there"""
+        cached = self._read_cache(endpoint)
+        if cached:
+            setattr(self, f"{endpoint}_data", cached)
+            print(f"[OK] {label} data loaded from cache")
+            return True
+        return False
+
+    def fetch_price_data(self, force_refresh=False):
+        """Fetch price movement data, served from the on-disk cache unless force_refresh is set"""
+        self._built_text = None
+        if not force_refresh and self._load_cached('price', "Price"):
+            return True
+
         print(f"Fetching price movement data...")
 
         try:
@@ -28,47 +333,40 @@ class Section9Builder:
                 "exchange": self.exchange
             }
 
-            response = requests.post(self.price_api_url, json=payload, timeout=30)
+            response = self._session.post(self.price_api_url, json=payload, timeout=30)
             response.raise_for_status()
-            result = response.json()
-
-            # Handle both string and int codes
-            code = str(result.get('code'))
-            if code == '200' and 'data' in result:
-                self.price_data = result['data']
-                print(f"[OK] Price API successful")
-                return True
-            else:
-                print(f"[WARNING] Price API returned code: {code}")
+            return self._store_result(_json_loads(response.content), 'price', "Price")
         except Exception as e:
             print(f"[WARNING] Price API failed: {e}")
 
         return False
 
-    def fetch_return_data(self):
-        """Fetch return analysis data"""
+    def fetch_return_data(self, force_refresh=False):
+        """Fetch return analysis data, served from the on-disk cache unless force_refresh is set"""
+        self._built_text = None
+        if not force_refresh and self._load_cached('return', "Return"):
+            return True
+
         print(f"Fetching return analysis data...")
 
         try:
-            response = requests.get(self.return_api_url, timeout=30)
+            response = self._session.get(self.return_api_url, timeout=30)
             response.raise_for_status()
-            result = response.json()
-
-            # Handle both string and int codes
-            code = str(result.get('code'))
-            if code == '200' and 'data' in result:
-                self.return_data = result['data']
-                print(f"[OK] Return API successful")
-                return True
-            else:
-                print(f"[WARNING] Return API returned code: {code}")
+            return self._store_result(_decode_return_response(response.content), 'return', "Return")
         except Exception as e:
             print(f"[WARNING] Return API failed: {e}")
 
         return False
 
-    def fetch_summary_data(self):
-        """Fetch stock summary data to get stock name and industry"""
+    def fetch_summary_data(self, force_refresh=False):
+        """
+        Fetch stock summary data to get stock name and industry,
+        served from the on-disk cache unless force_refresh is set
+        """
+        self._built_text = None
+        if not force_refresh and self._load_cached('summary', "Summary"):
+            return True
+
         print(f"Fetching stock summary data...")
 
         try:
@@ -77,340 +375,342 @@ class Section9Builder:
                 "exchange": self.exchange
             }
 
-            response = requests.post(self.summary_api_url, json=payload, timeout=30)
+            response = self._session.post(self.summary_api_url, json=payload, timeout=30)
             response.raise_for_status()
-            result = response.json()
+            return self._store_result(_json_loads(response.content), 'summary', "Summary")
+        except Exception as e:
+            print(f"[WARNING] Summary API failed: {e}")
+
+        return False
+
+    def _store_result(self, result, endpoint, label):
+        """
+        Keep result['data'] in self.<endpoint>_data (and the on-disk cache) if the API call
+        succeeded; returns whether it did
+        """
+        # Handle both string and int codes
+        code = str(result.get('code'))
+        if code == '200' and 'data' in result:
+            setattr(self, f"{endpoint}_data", result['data'])
+            self._write_cache(endpoint, result['data'])
+            print(f"[OK] {label} API successful")
+            return True
+
+        print(f"[WARNING] {label} API returned code: {code}")
+        return False
 
-            code = str(result.get('code'))
-            if code == '200' and 'data' in result:
-                self.summary_data = result['data']
-                print(f"[OK] Summary API successful")
-                return True
+    async def _fetch_async(self, client, endpoint, label, url, post=True):
+        """
+        Async counterpart of the fetch_* methods using an httpx.AsyncClient
+        (skipped if already loaded or cached)
+        """
+        self._built_text = None
+        if getattr(self, f"{endpoint}_data") or self._load_cached(endpoint, label):
+            return True
+
+        try:
+            if post:
+                payload = {
+                    "sid": int(self.stock_id),
+                    "exchange": self.exchange
+                }
+                response = await client.post(url, json=payload)
             else:
-                print(f"[WARNING] Summary API returned code: {code}")
+                response = await client.get(url)
+            response.raise_for_status()
+            decode = _decode_return_response if endpoint == 'return' else _json_loads
+            return self._store_result(decode(response.content), endpoint, label)
         except Exception as e:
-            print(f"[WARNING] Summary API failed: {e}")
+            print(f"[WARNING] {label} API failed: {e}")
 
         return False
 
+    async def fetch_all_data_async(self, client):
+        """
+        Fetch the data not loaded yet concurrently over client (an httpx.AsyncClient).
+        Returns an error message if the price or return data could not be fetched, else None.
+        """
+        fetches = [
+            self._fetch_async(client, 'price', "Price", self.price_api_url),
+            self._fetch_async(client, 'return', "Return", self.return_api_url, post=False),
+        ]
+        # Summary data is only used for the stock name and sector
+        if self.include_names:
+            fetches.append(self._fetch_async(client, 'summary', "Summary", self.summary_api_url))
+
+        price_ok, return_ok = (await asyncio.gather(*fetches))[:2]
+        return self._fetch_error(price_ok, return_ok)
+
+    @staticmethod
+    def _fetch_error(price_ok, return_ok):
+        """Error message for the first required API that failed, or None"""
+        if not price_ok:
+            return "ERROR: Failed to fetch price data"
+        if not return_ok:
+            return "ERROR: Failed to fetch return data"
+        return None
+
     def _get_stock_name_and_sector(self):
         """Extract stock name and industry from summary data"""
-        try:
-            main_header = self.summary_data.get('main_header', {})
-            stock_name = main_header.get('stock_name', 'Stock')
-            ind_name = main_header.get('ind_name', 'Industry')
-
-            # Return stock name, industry name (for backward compatibility), and full industry
-            return stock_name, ind_name, ind_name
-        except:
+        if not self.include_names:
             return "Stock", "Industry", ""
 
+        main_header = _deep_get(self.summary_data, 'main_header', kind=dict, default=_EMPTY)
+        stock_name = main_header.get('stock_name', 'Stock')
+        ind_name = main_header.get('ind_name', 'Industry')
+
+        # Return stock name, industry name (for backward compatibility), and full industry
+        return stock_name, ind_name, ind_name
+
     def _extract_current_price_data(self):
         """Extract current price data from TODAY_PRICE_STATS"""
-        try:
-            price_stats = self.price_data.get('TODAY_PRICE_STATS', [])
+        # Use BSE data if available, else the first available (NSE)
+        stats = _pick_exch(_deep_get(self.price_data, 'TODAY_PRICE_STATS'))
+        if not stats:
+            return None
 
-            # Use BSE data if available, else NSE
-            stats = None
-            for item in price_stats:
-                if item.get('exch', '').upper() == 'BSE':
-                    stats = item
+        # Extract fields
+        price_info = {
+            'date': stats.get('date', 'N/A'),
+            'last_traded_price': stats.get('price', 'N/A'),
+            'prev_close': 'N/A',
+            'open': 'N/A',
+            'day_high': stats.get('today_high', 'N/A'),
+            'day_low': stats.get('today_low', 'N/A'),
+            'volume': 'N/A',
+            'weighted_avg': 'N/A'
+        }
+
+        # Extract from fields array in one pass: each target is taken from the first entry
+        # that matches it, and the scan stops once all of them are found
+        remaining = dict(_PRICE_FIELD_MAP)
+        for field_obj in _deep_get(stats, 'fields', kind=list, default=()):
+            name = _deep_get(field_obj, 'name', kind=str, default='')
+
+            # Exact names hit the dict directly; decorated ones ("Prev. Close (Rs)") fall
+            # back to a substring match
+            part = name if name in remaining else next((part for part in remaining if part in name), None)
+            if part is not None:
+                price_info[remaining.pop(part)] = field_obj.get('value', '')
+                if not remaining:
                     break
 
-            if not stats and len(price_stats) > 0:
-                stats = price_stats[0]  # Fallback to first available
-
-            if not stats:
-                return None
-
-            # Extract fields
-            price_info = {
-                'date': stats.get('date', 'N/A'),
-                'last_traded_price': stats.get('price', 'N/A'),
-                'prev_close': 'N/A',
-                'open': 'N/A',
-                'day_high': stats.get('today_high', 'N/A'),
-                'day_low': stats.get('today_low', 'N/A'),
-                'volume': 'N/A',
-                'weighted_avg': 'N/A'
-            }
-
-            # Extract from fields array
-            for field_obj in stats.get('fields', []):
-                name = field_obj.get('name', '')
-                value = field_obj.get('value', '')
-
-                if 'Prev. Close' in name:
-                    price_info['prev_close'] = value
-                elif 'Open Price' in name:
-                    price_info['open'] = value
-                elif 'Volume traded' in name:
-                    price_info['volume'] = value
-                elif 'Weighted Avg Price' in name:
-                    price_info['weighted_avg'] = value
-
-            return price_info
-        except Exception as e:
-            print(f"[WARNING] Error extracting price data: {e}")
-            return None
+        return price_info
 
     def _extract_moving_averages(self):
         """Extract moving averages from MOVING_AVERAGES"""
-        try:
-            ma_data = self.price_data.get('MOVING_AVERAGES', [])
-
-            # Use BSE data if available, else NSE
-            ma_info = None
-            for item in ma_data:
-                if item.get('exch', '').upper() == 'BSE':
-                    ma_info = item
-                    break
-
-            if not ma_info and len(ma_data) > 0:
-                ma_info = ma_data[0]  # Fallback to first available
-
-            if not ma_info:
-                return None
+        # Use BSE data if available, else the first available (NSE)
+        ma_info = _pick_exch(_deep_get(self.price_data, 'MOVING_AVERAGES'))
+        if not ma_info:
+            return None
 
-            # Extract MA values
-            ma_values = {}
-            for item in ma_info.get('data', []):
-                field = item.get('field', '')
-                value = item.get('value', 'N/A')
+        # Extract MA values
+        ma_values = {}
+        for item in _deep_get(ma_info, 'data', kind=list, default=()):
+            field = _deep_get(item, 'field', kind=str, default='')
 
-                if 'Days' in field:
-                    ma_values[field] = value
+            if 'Days' in field:
+                ma_values[field] = item.get('value', 'N/A')
 
-            # Get position message
-            msg = ma_info.get('msg', '')
-            position = 'N/A'
-            if 'lower' in msg.lower():
-                position = 'Stock BELOW'
-            elif 'higher' in msg.lower():
-                position = 'Stock ABOVE'
+        # Get position message
+        msg = _deep_get(ma_info, 'msg', kind=str, default='').lower()
+        position = 'N/A'
+        if 'lower' in msg:
+            position = 'Stock BELOW'
+        elif 'higher' in msg:
+            position = 'Stock ABOVE'
 
-            return {'values': ma_values, 'position': position}
-        except Exception as e:
-            print(f"[WARNING] Error extracting moving averages: {e}")
-            return None
+        return {'values': ma_values, 'position': position}
 
     def _extract_returns_table(self):
         """Extract returns comparison from stock_vs_sensex_card"""
-        try:
-            vs_sensex = self.return_data.get('stock_vs_sensex_card', {})
-
-            # Map period keys to display names
-            period_mapping = {
-                '1D': '1 day',
-                '1W': '1 week',
-                '1M': '1 month',
-                '3M': '3 month',
-                '6M': '6 month',
-                'YTD': 'YTD',
-                '1Y': '1 year',
-                '2Y': '2 years',
-                '3Y': '3 years',
-                '4Y': '4 year',
-                '5Y': '5 years',
-                '10Y': '10 year'
-            }
-
-            returns_table = []
-            for key, display in period_mapping.items():
-                period_data = vs_sensex.get(key, {})
-                stock_data = period_data.get('STOCK', {})
-                sensex_data = period_data.get('SENSEX', {})
-
-                stock_val = stock_data.get('value', 'N/A')
-                stock_dir = stock_data.get('dir', 0)
-                sensex_val = sensex_data.get('value', 'N/A')
-                sensex_dir = sensex_data.get('dir', 0)
-
-                # Treat "0.00" with dir=0 as missing data (not truly 0% return)
-                if stock_val == "0.00" and stock_dir == 0:
-                    stock_val = 'N/A'
-                if sensex_val == "0.00" and sensex_dir == 0:
-                    sensex_val = 'N/A'
-
-                # Calculate alpha - ONLY if both stock and sensex have valid data
-                alpha = 'N/A'
-                if stock_val != 'N/A' and sensex_val != 'N/A':
-                    try:
-                        stock_num = float(stock_val)
-                        sensex_num = float(sensex_val)
-                        alpha_num = stock_num - sensex_num
-                        alpha = f"{alpha_num:+.2f}%"  # With sign
-                    except:
-                        alpha = 'N/A'
-
-                # Format percentages
-                stock_return = f"{stock_val}%" if stock_val != 'N/A' else 'N/A'
-                sensex_return = f"{sensex_val}%" if sensex_val != 'N/A' else 'N/A'
-
-                returns_table.append({
-                    'period': display,
-                    'stock_return': stock_return,
-                    'sensex_return': sensex_return,
-                    'alpha': alpha
-                })
-
-            return returns_table
-        except Exception as e:
-            print(f"[WARNING] Error extracting returns table: {e}")
-            return []
+        vs_sensex = _deep_get(self.return_data, 'stock_vs_sensex_card', kind=dict, default=_EMPTY)
+        return [_build_returns_row(display, vs_sensex.get(key, _EMPTY)) for key, display in _PERIOD_ORDER]
 
     def _extract_sector_comparison(self):
         """Extract sector comparison from return_summary_card"""
-        try:
-            summary = self.return_data.get('return_summary_card', {})
-
-            sector_info = summary.get('sector_return', {})
-            stock_return = summary.get('stock_return', {}).get('sentence2', 'N/A')
-
-            # Parse sector return from sentence like "SECTOR -19.37"
-            sector_sentence = sector_info.get('sentence2', '')
-            sector_return = 'N/A'
-            if 'SECTOR' in sector_sentence:
-                parts = sector_sentence.split('SECTOR')
-                if len(parts) > 1:
-                    sector_return = parts[1].strip()
-
-            # Parse underperformance from sentence like "UNDERPERFORMED BY -8.42"
-            perf_sentence = sector_info.get('sentence1', '')
-            performance = 'N/A'
-            if 'BY' in perf_sentence:
-                parts = perf_sentence.split('BY')
-                if len(parts) > 1:
-                    performance = parts[1].strip()
-
-            return {
-                'stock_return': f"{stock_return}%",
-                'sector_return': f"{sector_return}%",
-                'performance': performance
-            }
-        except Exception as e:
-            print(f"[WARNING] Error extracting sector comparison: {e}")
-            return None
+        summary = _deep_get(self.return_data, 'return_summary_card', kind=dict, default=_EMPTY)
+        stock_return = _deep_get(summary, 'stock_return', 'sentence2', default='N/A')
+
+        # Parse sector return from sentence like "SECTOR -19.37"
+        sector_sentence = _deep_get(summary, 'sector_return', 'sentence2', kind=str, default='')
+        sector_return = 'N/A'
+        if 'SECTOR' in sector_sentence:
+            sector_return = sector_sentence.split('SECTOR')[1].strip()
+
+        # Parse underperformance from sentence like "UNDERPERFORMED BY -8.42"
+        perf_sentence = _deep_get(summary, 'sector_return', 'sentence1', kind=str, default='')
+        performance = 'N/A'
+        if 'BY' in perf_sentence:
+            performance = perf_sentence.split('BY')[1].strip()
+
+        return {
+            'stock_return': f"{stock_return}%",
+            'sector_return': f"{sector_return}%",
+            'performance': performance
+        }
 
     def _extract_risk_adjusted_returns(self):
         """Extract risk-adjusted returns from risk_card"""
-        try:
-            risk_card = self.return_data.get('risk_card', {})
-
-            # Get period (default to 1Y)
-            periods = risk_card.get('periods', [])
-            selected_period = '1Y' if '1Y' in periods else (periods[0] if periods else '1Y')
-
-            # Get table data
-            table = risk_card.get('table', [])
-            if len(table) < 3:
-                return None
-
-            # Table structure: [headers, TCS row, Sensex row]
-            stock_row = table[1] if len(table) > 1 else []
-            sensex_row = table[2] if len(table) > 2 else []
-
-            risk_info = {
-                'stock_absolute': stock_row[1] if len(stock_row) > 1 else 'N/A',
-                'stock_risk_adjusted': stock_row[2] if len(stock_row) > 2 else 'N/A',
-                'stock_volatility': stock_row[3] if len(stock_row) > 3 else 'N/A',
-                'sensex_absolute': sensex_row[1] if len(sensex_row) > 1 else 'N/A',
-                'sensex_risk_adjusted': sensex_row[2] if len(sensex_row) > 2 else 'N/A',
-                'sensex_volatility': sensex_row[3] if len(sensex_row) > 3 else 'N/A',
-                'risk_category': risk_card.get('sub_header', 'N/A')
-            }
+        risk_card = _deep_get(self.return_data, 'risk_card', kind=dict, default=_EMPTY)
 
-            return risk_info
-        except Exception as e:
-            print(f"[WARNING] Error extracting risk-adjusted returns: {e}")
+        # Table structure: [headers, TCS row, Sensex row]
+        table = _deep_get(risk_card, 'table', kind=list, default=())
+        if len(table) < 3:
             return None
 
+        return {
+            'stock_absolute': _deep_get(table, 1, 1, default='N/A'),
+            'stock_risk_adjusted': _deep_get(table, 1, 2, default='N/A'),
+            'stock_volatility': _deep_get(table, 1, 3, default='N/A'),
+            'sensex_absolute': _deep_get(table, 2, 1, default='N/A'),
+            'sensex_risk_adjusted': _deep_get(table, 2, 2, default='N/A'),
+            'sensex_volatility': _deep_get(table, 2, 3, default='N/A'),
+            'risk_category': _deep_get(risk_card, 'sub_header', kind=str, default='N/A')
+        }
+
     def _extract_beta_info(self):
         """Extract beta information from return_summary_card messages"""
-        try:
-            summary = self.return_data.get('return_summary_card', {})
-            messages = summary.get('messages', [])
-
-            beta_info = {
-                'beta': 'N/A',
-                'classification': 'N/A',
-                'interpretation': 'N/A'
-            }
-
-            for msg in messages:
-                prefix = msg.get('prefix', '')
-                suffix = msg.get('suffix', '')
-
-                if 'Beta' in prefix:
-                    # Extract classification from prefix like "Medium Beta Stock"
-                    beta_info['classification'] = prefix
-
-                    # Extract beta value from suffix like "TCS has a beta(adjusted beta) of 1.00 with SENSEX"
-                    if 'beta' in suffix:
-                        import re
-                        match = re.search(r'of\s+([\d.]+)', suffix)
-                        if match:
-                            beta_info['beta'] = match.group(1)
-
-                    # Set interpretation based on classification
-                    if 'High' in prefix:
-                        beta_info['interpretation'] = 'More volatile than the market'
-                    elif 'Medium' in prefix:
-                        beta_info['interpretation'] = 'Generally rise and fall in line with the market'
-                    elif 'Low' in prefix:
-                        beta_info['interpretation'] = 'Less volatile than the market'
-
-            return beta_info
-        except Exception as e:
-            print(f"[WARNING] Error extracting beta info: {e}")
-            return None
+        messages = _deep_get(self.return_data, 'return_summary_card', 'messages', kind=list, default=())
+
+        beta_info = {
+            'beta': 'N/A',
+            'classification': 'N/A',
+            'interpretation': 'N/A'
+        }
+
+        for msg in messages:
+            prefix = _deep_get(msg, 'prefix', kind=str, default='')
+
+            if 'Beta' in prefix:
+                # Extract classification from prefix like "Medium Beta Stock"
+                beta_info['classification'] = prefix
+
+                # Extract beta value from suffix like "TCS has a beta(adjusted beta) of 1.00 with SENSEX"
+                suffix = _deep_get(msg, 'suffix', kind=str, default='')
+                if 'beta' in suffix:
+                    match = _BETA_VALUE_RE.search(suffix)
+                    if match:
+                        beta_info['beta'] = match.group(1)
+
+                # Set interpretation based on classification
+                if 'High' in prefix:
+                    beta_info['interpretation'] = 'More volatile than the market'
+                elif 'Medium' in prefix:
+                    beta_info['interpretation'] = 'Generally rise and fall in line with the market'
+                elif 'Low' in prefix:
+                    beta_info['interpretation'] = 'Less volatile than the market'
+
+        return beta_info
 
     def build_section(self):
-        """Build SECTION 9 from API data"""
-        # Fetch all data first (if not already loaded)
+        """Build SECTION 9 from API data (the result is reused until the data is fetched again)"""
+        if self._built_text is not None:
+            return self._built_text
+
+        # Fetch all data first (if not already loaded); the three APIs are independent
+        # and network-bound, so they are fetched concurrently
+        price_future = return_future = None
+        futures = []
         if not self.price_data:
-            if not self.fetch_price_data():
-                return "ERROR: Failed to fetch price data"
-
+            price_future = self._executor.submit(self.fetch_price_data)
+            futures.append(price_future)
         if not self.return_data:
-            if not self.fetch_return_data():
-                return "ERROR: Failed to fetch return data"
-
-        # Fetch summary data to get stock name and sector
-        if not self.summary_data:
-            self.fetch_summary_data()
-
+            return_future = self._executor.submit(self.fetch_return_data)
+            futures.append(return_future)
+        # Summary data is only used for the stock name and sector
+        if self.include_names and not self.summary_data:
+            futures.append(self._executor.submit(self.fetch_summary_data))
+        wait(futures)
+
+        error = self._fetch_error(price_future is None or price_future.result(),
+                                  return_future is None or return_future.result())
+        if error:
+            return error
+        return self._render_section()
+
+    async def build_section_async(self, client=None):
+        """
+        Build SECTION 9 from an event loop. With httpx + h2 installed the three API calls
+        share one multiplexed HTTP/2 connection (client, if given, is an httpx.AsyncClient
+        shared with other builders); otherwise build_section runs in a worker thread.
+        """
+        if self._built_text is not None:
+            return self._built_text
+
+        if client is None:
+            if not HTTPX_AVAILABLE:
+                return await asyncio.to_thread(self.build_section)
+            async with _async_client() as client:
+                return await self.build_section_async(client)
+
+        error = await self.fetch_all_data_async(client)
+        if error:
+            return error
+        return self._render_section()
+
+    @classmethod
+    async def build_many_async(cls, stock_ids, exchange=0, concurrency=8, include_names=True):
+        """
+        Build SECTION 9 for many stocks from an event loop, with at most concurrency stocks
+        in flight; with httpx + h2 installed all requests share one HTTP/2 client.
+        include_names=False skips the summary API (see __init__).
+        Returns dictionary of stock_id -> section text.
+        """
+        builders = [cls(stock_id, exchange, include_names) for stock_id in stock_ids]
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def build(builder, client):
+            async with semaphore:
+                return await builder.build_section_async(client)
+
+        if HTTPX_AVAILABLE:
+            async with _async_client(max_keepalive_connections=concurrency) as client:
+                sections = await asyncio.gather(*(build(builder, client) for builder in builders))
+        else:
+            sections = await asyncio.gather(*(build(builder, None) for builder in builders))
+
+        return {builder.stock_id: section for builder, section in zip(builders, sections)}
+
+    @classmethod
+    def build_many(cls, stock_ids, exchange=0, concurrency=8, include_names=True):
+        """
+        Build SECTION 9 for many stocks concurrently (see build_many_async).
+        Returns dictionary of stock_id -> section text.
+        """
+        return asyncio.run(cls.build_many_async(stock_ids, exchange, concurrency, include_names))
+
+    def _validate(self):
+        """Which parts of the fetched data are present (partial responses leave some out)"""
+        return {
+            'price': bool(_deep_get(self.price_data, 'TODAY_PRICE_STATS')),
+            'ma': bool(_deep_get(self.price_data, 'MOVING_AVERAGES')),
+            'returns': bool(_deep_get(self.return_data, 'stock_vs_sensex_card')),
+            'sector': bool(_deep_get(self.return_data, 'return_summary_card')),
+            'risk': bool(_deep_get(self.return_data, 'risk_card')),
+        }
+
+    def _render_section(self):
+        """Format SECTION 9 from the fetched data"""
         # Get stock name and sector
         stock_name, sector_name, full_industry = self._get_stock_name_and_sector()
 
-        # Extract all components
-        price_info = self._extract_current_price_data()
-        ma_info = self._extract_moving_averages()
-        returns_table = self._extract_returns_table()
-        sector_comp = self._extract_sector_comparison()
-        risk_info = self._extract_risk_adjusted_returns()
-        beta_info = self._extract_beta_info()
+        # Extract all components, skipping extraction for the parts the data lacks
+        present = self._validate()
+        price_info = self._extract_current_price_data() if present['price'] else None
+        ma_info = self._extract_moving_averages() if present['ma'] else None
+        returns_table = self._extract_returns_table() if present['returns'] else _NO_RETURNS
+        sector_comp = self._extract_sector_comparison() if present['sector'] else _NO_SECTOR_COMPARISON
+        risk_info = self._extract_risk_adjusted_returns() if present['risk'] else None
+        # The beta messages are part of return_summary_card too
+        beta_info = self._extract_beta_info() if present['sector'] else _NO_BETA
 
         # Build output
-        lines = []
-        lines.append("=" * 80)
-        lines.append("SECTION 9: STOCK PRICE & RETURNS ANALYSIS")
-        lines.append("=" * 80)
-        lines.append("")
-        lines.append("")
+        lines = [_HEADER]
 
         # CURRENT PRICE DATA
         if price_info:
-            lines.append(f"CURRENT PRICE DATA ({price_info.get('date', 'N/A')}):")
-            lines.append("-" * 33)
-            lines.append(f"Last Traded Price:                    ₹{price_info.get('last_traded_price', 'N/A')},")
-            lines.append(f"Previous Close:                       ₹{price_info.get('prev_close', 'N/A')}")
-            lines.append(f"Open:                                 ₹{price_info.get('open', 'N/A')}")
-            lines.append(f"Day's High:                           ₹{price_info.get('day_high', 'N/A')}")
-            lines.append(f"Day's Low:                            ₹{price_info.get('day_low', 'N/A')}")
-            lines.append(f"Volume Traded:                        {price_info.get('volume', 'N/A')} shares")
-            lines.append(f"Weighted Avg Price:                   ₹{price_info.get('weighted_avg', 'N/A')}")
-            lines.append("")
+            lines.append(_PRICE_TEMPLATE.format_map(_Fields(price_info)))
 
         # MOVING AVERAGES
         if ma_info:
@@ -419,39 +719,28 @@ class Section9Builder:
             ma_values = ma_info.get('values', {})
             position = ma_info.get('position', 'N/A')
 
-            for field in ['5 Days', '20 Days', '50 Days', '100 Days', '200 Days']:
-                value = ma_values.get(field, 'N/A')
-                lines.append(f"{field} MA:{''.ljust(34 - len(field))}₹{value} ({position})")
+            for field, label in _MA_ROWS:
+                lines.append(f"{label}₹{ma_values.get(field, 'N/A')} ({position})")
             lines.append("")
 
         # PRICE RETURNS
         if returns_table and len(returns_table) > 0:
-            lines.append("PRICE RETURNS:")
-            lines.append("-" * 14)
-            lines.append(f"{'Period':<16}{'Stock Return':<16}{'Sensex Return':<16}Alpha")
-            lines.append("-" * 54)
-
+            lines.append(_RETURNS_HEADER)
             for row in returns_table:
-                period = row['period']
-                stock = row['stock_return']
-                sensex = row['sensex_return']
-                alpha = row['alpha']
-                lines.append(f"{period:<16}{stock:<16}{sensex:<16}{alpha}")
+                lines.append(f"{row['period']:<16}{row['stock_return']:<16}{row['sensex_return']:<16}{row['alpha']}")
             lines.append("")
 
         # SECTOR COMPARISON
         if sector_comp:
             lines.append("SECTOR COMPARISON:")
             lines.append("-" * 18)
-            # Use dynamic stock name, pad to 25 chars for alignment
+            # Use dynamic stock name, padded to the value column
             stock_label = f"1 Year Return ({stock_name}):"
-            stock_label = stock_label.ljust(38)
-            lines.append(f"{stock_label}{sector_comp.get('stock_return', 'N/A')}")
+            lines.append(f"{stock_label:<38}{sector_comp.get('stock_return', 'N/A')}")
 
             # Use dynamic sector name
             sector_label = f"{full_industry if full_industry else sector_name} Return:"
-            sector_label = sector_label.ljust(38)
-            lines.append(f"{sector_label}{sector_comp.get('sector_return', 'N/A')}")
+            lines.append(f"{sector_label:<38}{sector_comp.get('sector_return', 'N/A')}")
 
             lines.append(f"Underperformance vs Sector:           {sector_comp.get('performance', 'N/A')}")
             lines.append("")
@@ -459,25 +748,14 @@ class Section9Builder:
 
         # RISK-ADJUSTED RETURNS
         if risk_info:
-            lines.append("RISK-ADJUSTED RETURNS (1 Year):")
-            lines.append("-" * 32)
-            lines.append(f"Stock Absolute Return:                {risk_info.get('stock_absolute', 'N/A')}")
-            lines.append(f"Risk-Adjusted Return:                 {risk_info.get('stock_risk_adjusted', 'N/A')}")
-            lines.append(f"Volatility:                           {risk_info.get('stock_volatility', 'N/A')}")
-            lines.append(f"Sharpe Ratio:                         {'Negative' if '-' in str(risk_info.get('stock_risk_adjusted', '')) else 'Positive'}")
-            lines.append(f"Risk Category:                        {risk_info.get('risk_category', 'N/A').upper()}")
-            lines.append("")
-            lines.append(f"Sensex Absolute Return:               {risk_info.get('sensex_absolute', 'N/A')}")
-            lines.append(f"Sensex Risk-Adjusted Return:          {risk_info.get('sensex_risk_adjusted', 'N/A')}")
-            lines.append(f"Sensex Volatility:                    {risk_info.get('sensex_volatility', 'N/A')}")
-            lines.append("")
+            context = _Fields(risk_info)
+            context['sharpe'] = 'Negative' if '-' in str(risk_info.get('stock_risk_adjusted', '')) else 'Positive'
+            context['risk_category'] = risk_info.get('risk_category', 'N/A').upper()
+            lines.append(_RISK_TEMPLATE.format_map(context))
 
         # BETA & RISK
         if beta_info:
-            lines.append("BETA & RISK:")
-            lines.append("-" * 12)
             classification = beta_info.get('classification', 'N/A')
-            beta_val = beta_info.get('beta', 'N/A')
 
             # Extract just the beta category from classification
             beta_category = 'N/A'
@@ -488,49 +766,64 @@ class Section9Builder:
             elif 'Low Beta' in classification:
                 beta_category = 'Low Beta'
 
-            lines.append(f"Beta (Adjusted):                      {beta_val} ({beta_category})")
-            lines.append(f"Classification:                       {classification}")
-            lines.append(f"Interpretation:                       {beta_info.get('interpretation', 'N/A')}")
-            lines.append("")
+            context = _Fields(beta_info)
+            context['beta_category'] = beta_category
+            lines.append(_BETA_TEMPLATE.format_map(context))
 
         lines.append("")
-        return "\n".join(lines)
+        self._built_text = "\n".join(lines)
+        return self._built_text
+
+    def save_to_file(self, output_file, section_text=None):
+        """Save section to file, building it unless section_text is given"""
+        if section_text is None:
+            section_text = self.build_section()
+        _write_section(output_file, section_text)
+        return section_text
 
-    def save_to_file(self, output_file):
-        """Build section and save to file"""
-        section_text = self.build_section()
 
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(section_text)
+def _write_section(output_file, section_text):
+    """Write an already built Section 9 text to output_file"""
+    # Encode once and write the bytes directly instead of going through a text-mode wrapper
+    with open(output_file, 'wb') as f:
+        f.write(section_text.encode('utf-8'))
+
+    print(f"\n[OK] Section 9 saved to: {output_file}")
 
-        print(f"\n[OK] Section 9 saved to: {output_file}")
-        return section_text
 
+@atexit.register
+def _shutdown_executor():
+    Section9Builder._executor.shutdown(wait=True)
 
-def main():
-    """Test the Section 9 builder"""
-    stock_id = 513374  # TCS
+
+def main(stock_ids=None):
+    """Test the Section 9 builder with TCS, or with several stocks built concurrently"""
+    if not stock_ids:
+        stock_ids = [513374]  # TCS
+        label = "TCS"
+    else:
+        label = ", ".join(str(stock_id) for stock_id in stock_ids)
 
     print("=" * 80)
-    print("SECTION 9 BUILDER - Testing with TCS")
+    print(f"SECTION 9 BUILDER - Testing with {label}")
     print("=" * 80)
     print()
 
-    builder = Section9Builder(stock_id)
-    section_text = builder.build_section()
-
-    # Save to file
-    builder.save_to_file("section9_output.txt")
+    sections = Section9Builder.build_many(stock_ids)
 
-    output_file = f"section9_stock_{stock_id}.txt"
-    builder.save_to_file(output_file)
+    # The first stock is also saved as section9_output.txt
+    first_id = str(stock_ids[0])
+    output_files = [("section9_output.txt", first_id)]
+    output_files += [(f"section9_stock_{stock_id}.txt", stock_id) for stock_id in sections]
+    for path, stock_id in output_files:
+        _write_section(path, sections[stock_id])
 
     print("\n" + "=" * 80)
     print("SECTION 9 OUTPUT SAVED")
     print("=" * 80)
     print(f"Files created:")
-    print(f"  - section9_output.txt")
-    print(f"  - {output_file}")
+    for path, _ in output_files:
+        print(f"  - {path}")
 
 
 if __name__ == "__main__":